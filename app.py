@@ -1,69 +1,143 @@
 # Run with:
 # FLASK_APP=app.py flask run
 
-from flask import Flask, render_template, request
+from flask import (
+    Flask,
+    Response,
+    abort,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_with_context,
+    url_for,
+)
 
 import config
-import garmin.course
-import swagger_client
-import strava.tokens
-from garmin.client import GarminClient
+import garmin.elevation
+import transfer
+from copied_courses import CopiedCourses
+from garmin.elevation_cache import ElevationCache
+from garmin.pool import GarminClientPool
+from job_queue import JobQueue
+from strava.route_catalogue import RouteCatalogue
 
 app = Flask(__name__)
 
+garmin_pool = GarminClientPool(
+    config.garmin_user, config.garmin_password, cookie_path="persist/garmin_session"
+)
+
+elevation_provider = None
+if getattr(config, "elevation_tile_dir", None):
+    elevation_provider = garmin.elevation.HgtElevationProvider(config.elevation_tile_dir)
+
+elevation_cache = ElevationCache("persist/elevation_cache.sqlite")
+
+copied_courses = CopiedCourses("persist/copied_courses.sqlite")
+
+route_catalogue = RouteCatalogue(config.strava_athlete_id, path="persist/routes.sqlite")
+
+
+def run_copy(params, progress):
+    course_id, _ = transfer.copy_route(
+        params["route_id"],
+        params["route_type"],
+        params["route_name"],
+        garmin_pool,
+        elevation_provider=elevation_provider,
+        elevation_cache=elevation_cache,
+        simplify_tolerance=getattr(config, "simplify_tolerance", None),
+        progress=progress,
+        copied_courses=copied_courses,
+    )
+    return {"course_id": course_id}
+
+
+# Copies run in the background, one per Garmin session.
+copy_jobs = JobQueue("persist/jobs.sqlite", run_copy, workers=garmin_pool.size)
+copy_jobs.start()
+
+
+def stream_template(template_name, **context):
+    """Render a template as a stream of parts, instead of one string."""
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+    # Not buffered, so that the head is sent before the first route is there.
+    return template.stream(context)
+
 
 @app.route("/")
 def routes():
-    strava_client = swagger_client.ApiClient()
-    strava_client.configuration.access_token = strava.tokens.request_access_token()
-    routes_api = swagger_client.RoutesApi(api_client=strava_client)
-    routes = routes_api.get_routes_by_athlete_id(
-        config.strava_athlete_id, page=1, per_page=200
+    # Without a cached listing, the first routes are sent while the rest is
+    # still being fetched.
+    return Response(
+        stream_with_context(
+            stream_template("routes.html", routes=route_catalogue.iter_routes())
+        )
     )
 
-    return render_template("routes.html", routes=routes)
-
 
 @app.route("/copy", methods=["POST"])
 def copy():
-    route_id = request.form["route_id"]
-    route_type = int(request.form["route_type"])  # Cycling is type 1, running is type 2
-    route_name = request.form["route_name"]
-
-    # Get tcx from strava
-    strava_client = swagger_client.ApiClient()
-    strava_client.configuration.access_token = strava.tokens.request_access_token()
-    tcx_response = strava_client.call_api(
-        f"/routes/{route_id}/export_tcx",
-        "GET",
-        {},
-        [],
-        {},
-        post_params=[],
-        files={},
-        response_type="file",
-        auth_settings=["strava_oauth"],
-        _return_http_data_only=True,
-        _preload_content=False,
+    job_id = copy_jobs.submit(
+        {
+            "route_id": request.form["route_id"],
+            # Cycling is type 1, running is type 2
+            "route_type": int(request.form["route_type"]),
+            "route_name": request.form["route_name"],
+        }
     )
-    tcx_bytes = tcx_response.data
+    return redirect(url_for("copy_status", job_id=job_id), code=303)
 
-    # Connect to Garmin
-    with GarminClient(config.garmin_user, config.garmin_password) as garmin_client:
-        import_response = garmin_client.import_course(tcx_bytes)
-        course = import_response.json()
 
-        elevation_response = garmin_client.post_elevation(
-            garmin.course.geopoints_to_elevation_tuples(course["geoPoints"])
-        )
-        elevation_tuples = elevation_response.json()
+@app.route("/copy/<job_id>")
+def copy_status(job_id):
+    return render_template("copy.html", job_id=job_id)
+
+
+@app.route("/jobs/<job_id>")
+def job(job_id):
+    job = copy_jobs.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(
+        {
+            "status": job["status"],
+            "stage": job["stage"],
+            "result": job["result"],
+            "error": job["error"],
+        }
+    )
+
 
-        garmin_activity_type = {1: 10, 2: 1}.get(route_type, 10)
-        garmin.course.add_course_info(
-            course, route_name, garmin_activity_type, elevation_tuples
+@app.route("/copy_batch", methods=["POST"])
+def copy_batch():
+    # The routes were selected from the listing, which has their names and
+    # types.
+    routes = {str(route.id): route for route in route_catalogue.routes()}
+    route_ids = request.form.getlist("route_id")
+    if not all(route_id in routes for route_id in route_ids):
+        abort(400)
+    job_ids = [
+        copy_jobs.submit(
+            {
+                "route_id": route_id,
+                "route_type": routes[route_id].type,
+                "route_name": routes[route_id].name,
+            }
         )
+        for route_id in route_ids
+    ]
+    return redirect(url_for("copy_batch_status", job_id=job_ids), code=303)
 
-        course_response = garmin_client.post_course(course)
-        saved_course = course_response.json()
 
-    return render_template("copy.html", garmin_route_id=saved_course["courseId"])
+@app.route("/copy_batch")
+def copy_batch_status():
+    jobs = []
+    for job_id in request.args.getlist("job_id"):
+        job = copy_jobs.get(job_id)
+        if job is None:
+            abort(404)
+        jobs.append({"id": job_id, "route_name": job["params"]["route_name"]})
+    return render_template("copy_batch.html", jobs=jobs)
@@ -0,0 +1,23 @@
+"""
+Writing files that other threads and processes may be reading at the same time.
+"""
+
+import os
+import tempfile
+
+
+def write_atomically(path: str, content: str) -> None:
+    """
+    Write the file through a rename, so that readers never see a partially
+    written file. The file is only readable by the owner.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
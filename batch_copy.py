@@ -0,0 +1,70 @@
+"""
+Copy many Strava routes to Garmin at once:
+
+    python batch_copy.py --workers 4 ROUTE_ID [ROUTE_ID ...]
+"""
+
+import argparse
+import logging
+import time
+
+import config
+import garmin.elevation
+import transfer
+from copied_courses import CopiedCourses
+from garmin.elevation_cache import ElevationCache
+from garmin.pool import GarminClientPool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy Strava routes to Garmin.")
+    parser.add_argument("route_ids", nargs="+", type=int)
+    parser.add_argument(
+        "--workers", type=int, default=4, help="number of routes copied at once"
+    )
+    parser.add_argument(
+        "--simplify",
+        type=float,
+        default=getattr(config, "simplify_tolerance", None),
+        metavar="METERS",
+        help="simplify the courses with this tolerance",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    garmin_pool = GarminClientPool(
+        config.garmin_user,
+        config.garmin_password,
+        size=args.workers,
+        cookie_path="persist/garmin_session",
+    )
+    elevation_provider = None
+    if getattr(config, "elevation_tile_dir", None):
+        elevation_provider = garmin.elevation.HgtElevationProvider(
+            config.elevation_tile_dir
+        )
+
+    start = time.perf_counter()
+    results = transfer.copy_routes(
+        args.route_ids,
+        garmin_pool,
+        workers=args.workers,
+        elevation_provider=elevation_provider,
+        elevation_cache=ElevationCache("persist/elevation_cache.sqlite"),
+        simplify_tolerance=args.simplify,
+        copied_courses=CopiedCourses("persist/copied_courses.sqlite"),
+    )
+    elapsed = time.perf_counter() - start
+    garmin_pool.close()
+
+    for r in results:
+        if "course_id" in r:
+            print("%s -> %s (%.1fs)" % (r["route_id"], r["course_id"], r["seconds"]))
+        else:
+            print("%s failed: %s" % (r["route_id"], r["error"]))
+    print("%d routes in %.1fs" % (len(results), elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,3 +5,13 @@ strava_client_secret = ''
 # Garmin login info:
 garmin_user = ''
 garmin_password = ''
+
+# Directory with SRTM .hgt tiles to look up elevations locally, see
+# garmin/elevation.py. Without tiles, Garmin fills in the elevations.
+elevation_tile_dir = None
+
+# Drop points within this many meters of the simplified course, or None to keep
+# all points. The distance is kept within 0.2%, and with elevation_tile_dir the
+# elevation gain and loss within 5%. Without it the gain is not preserved. See
+# garmin/simplify.py.
+simplify_tolerance = None
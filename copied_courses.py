@@ -0,0 +1,77 @@
+"""
+A record of the routes that were copied to Garmin, to not copy them again.
+
+Copies are recorded by the Strava route id and a copy key: the sha256 of the
+positions of the route's track points and of the settings of the copy (the
+name and type of the course and the simplify tolerance). The tcx export itself
+can't be hashed, because Strava fills in new times on every export. A route
+that was edited, or copied with other settings, gets a new course, while a
+repeated copy gives the course it was copied to before without any Garmin
+calls. A course that was deleted on Garmin is not noticed; forget the route to
+copy it again.
+"""
+
+import hashlib
+import json
+import struct
+import time
+
+import database
+
+
+def copy_key(positions, *settings):
+    """
+    The copy key of a route.
+    :param positions: The (latitude, longitude) of the track points of the
+      route, as floats.
+    :param settings: JSON serializable values that the copy depends on.
+    """
+    sha256 = hashlib.sha256(json.dumps(settings).encode())
+    for latitude, longitude in positions:
+        sha256.update(struct.pack("<dd", latitude, longitude))
+    return sha256.hexdigest()
+
+
+class CopiedCourses(object):
+    """Garmin course ids by Strava route id and copy key, in SQLite.
+    :param path: The database file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with database.connect(self.path) as connection:
+            # Copies used to be recorded by the hash of the tcx, which never
+            # matches again.
+            connection.execute("DROP TABLE IF EXISTS copied_course")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS course_copy ("
+                " route_id TEXT NOT NULL,"
+                " copy_key TEXT NOT NULL,"
+                " course_id INTEGER NOT NULL,"
+                " copied_at REAL NOT NULL,"
+                " PRIMARY KEY (route_id, copy_key))"
+            )
+
+    def get(self, route_id, key):
+        """The id of the course the route was copied to, or None."""
+        with database.connect(self.path) as connection:
+            row = connection.execute(
+                "SELECT course_id FROM course_copy"
+                " WHERE route_id = ? AND copy_key = ?",
+                (str(route_id), key),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, route_id, key, course_id):
+        with database.connect(self.path) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO course_copy VALUES (?, ?, ?, ?)",
+                (str(route_id), key, course_id, time.time()),
+            )
+
+    def forget(self, route_id):
+        """Forget all copies of the route."""
+        with database.connect(self.path) as connection:
+            connection.execute(
+                "DELETE FROM course_copy WHERE route_id = ?", (str(route_id),)
+            )
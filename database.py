@@ -0,0 +1,32 @@
+"""
+Connections to the SQLite databases in persist/, which are shared by the
+threads and processes of the app.
+"""
+
+import contextlib
+import sqlite3
+
+
+@contextlib.contextmanager
+def connect(path, autocommit=False):
+    """
+    A connection to the database, that is closed after the block. Locks of
+    other connections are waited for up to 30 seconds.
+    :param autocommit: Without autocommit, the block is one transaction that
+      is committed, or rolled back if it raises. With autocommit, every
+      statement is committed right away, unless a transaction is started
+      explicitly. Rows can then also be accessed by column name.
+    """
+    if autocommit:
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+    else:
+        connection = sqlite3.connect(path, timeout=30)
+    try:
+        if autocommit:
+            yield connection
+        else:
+            with connection:
+                yield connection
+    finally:
+        connection.close()
@@ -0,0 +1,31 @@
+"""
+Check that parsing the tcx locally gives the same course as Garmin's course
+import, and time it.
+"""
+import time
+
+import garmin.course_file
+
+import examples.garmin_import_response
+
+with open("examples/garmin_upload_example.tcx", "rb") as f:
+    tcx = f.read()
+
+reference = examples.garmin_import_response.get()
+
+course = garmin.course_file.import_course(tcx)
+assert course == reference, "course differs from the import response"
+
+# In chunks, like it comes from the Strava export.
+chunks = [tcx[i : i + 4096] for i in range(0, len(tcx), 4096)]
+assert garmin.course_file.import_course(chunks) == reference
+
+n = 100
+start = time.perf_counter()
+for _ in range(n):
+    garmin.course_file.import_course(chunks)
+elapsed = (time.perf_counter() - start) / n
+print(
+    "%d points, %d bytes: %.2fms per parse"
+    % (len(course["geoPoints"]), len(tcx), elapsed * 1000)
+)
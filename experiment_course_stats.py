@@ -0,0 +1,41 @@
+from pprint import pprint
+import time
+
+import garmin.course
+import garmin.stats
+from garmin.track import GeoTrack
+
+import examples.garmin_elevation_response
+
+elevation_data = examples.garmin_elevation_response.get()
+track = GeoTrack.from_elevation_tuples(elevation_data)
+
+# The separate passes, as add_course_info used to do them.
+start = time.perf_counter()
+garmin.course.add_distances_to_track(track)
+elevations = track.elevation.tolist()
+reference = {
+    "distance": track.distance[-1].item(),
+    "elevation_gain": garmin.course.calculate_elevation_gain(elevations),
+    "elevation_loss": garmin.course.calculate_elevation_loss(elevations),
+    "bounding_box": garmin.course.calculate_bounding_box(track),
+    "start_point": garmin.course.pick_start_point(track),
+}
+print("separate passes: %.2fms" % ((time.perf_counter() - start) * 1000))
+
+start = time.perf_counter()
+streamed = garmin.stats.course_stats(tuple(p) for p in elevation_data)
+print("course_stats: %.2fms" % ((time.perf_counter() - start) * 1000))
+
+start = time.perf_counter()
+vectorized = garmin.stats.track_stats(track)
+print("track_stats: %.2fms" % ((time.perf_counter() - start) * 1000))
+
+for stats in (streamed, vectorized):
+    differences = {
+        key: (value, getattr(stats, key))
+        for key, value in reference.items()
+        if value != getattr(stats, key)
+    }
+    pprint(differences)
+    print("max distance difference: %g" % abs(stats.distances - track.distance).max())
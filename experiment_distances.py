@@ -0,0 +1,43 @@
+from pprint import pprint
+import time
+import geopy.distance
+
+import garmin.geodesy
+
+import examples.garmin_import_response
+
+
+def geopy_cumulative_distances(points):
+    prev = None
+    distance = 0
+    distances = []
+    for cur in points:
+        if prev:
+            distance += geopy.distance.distance(prev, cur).m
+        distances.append(distance)
+        prev = cur
+    return distances
+
+
+geopoints = examples.garmin_import_response.get()["geoPoints"]
+points = [(p["latitude"], p["longitude"]) for p in geopoints]
+lats, lons = zip(*points)
+
+start = time.perf_counter()
+reference = geopy_cumulative_distances(points)
+print("geopy: %.1fms" % ((time.perf_counter() - start) * 1000))
+
+results = {}
+for method in garmin.geodesy.METHODS:
+    start = time.perf_counter()
+    distances = garmin.geodesy.cumulative_distances(lats, lons, method)
+    elapsed = (time.perf_counter() - start) * 1000
+    errors = abs(distances - reference)
+    results[method] = {
+        "time_ms": round(elapsed, 2),
+        "max_error_m": errors.max(),
+        "total_error_m": distances[-1] - reference[-1],
+    }
+
+print("total distance: %.3fm" % reference[-1])
+pprint(results)
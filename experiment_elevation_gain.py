@@ -0,0 +1,26 @@
+import time
+import numpy as np
+
+from garmin.elevation_analyzer import elevation_gain_loss
+
+import examples.garmin_elevation_response
+
+example = [elevation for lat, lon, elevation in examples.garmin_elevation_response.get()]
+
+# Densely sampled synthetic tracks of 50k points, from noisy to smooth.
+rng = np.random.RandomState(1)
+tracks = {"example": example}
+for step in (0.5, 0.05, 0.005):
+    tracks["random walk %s" % step] = (
+        100 + np.cumsum(rng.normal(0, step, 50000))
+    ).tolist()
+
+for name, elevations in tracks.items():
+    results = {}
+    for method in ("python", "numpy", "auto"):
+        start = time.perf_counter()
+        results[method] = elevation_gain_loss(elevations, method=method)
+        elapsed = (time.perf_counter() - start) * 1000
+        print("%s, %s: %.2fms" % (name, method, elapsed))
+    assert results["python"] == results["numpy"] == results["auto"], results
+    print("gain/loss:", results["python"])
@@ -0,0 +1,39 @@
+"""
+Compare the elevations from local .hgt tiles with those that Garmin returned
+for the example course:
+
+    python experiment_elevation_providers.py TILE_DIRECTORY
+
+The example course needs the tile N52E005.hgt.
+"""
+import sys
+import time
+
+import numpy as np
+
+import garmin.course
+import garmin.elevation
+from garmin.elevation_analyzer import elevation_gain_loss
+
+import examples.garmin_elevation_response
+import examples.garmin_import_response
+
+geopoints = examples.garmin_import_response.get()["geoPoints"]
+reference = np.array([e for _, _, e in examples.garmin_elevation_response.get()])
+
+provider = garmin.elevation.HgtElevationProvider(sys.argv[1])
+start = time.perf_counter()
+elevation_data = garmin.course.lookup_elevation(geopoints, provider)
+elapsed = time.perf_counter() - start
+
+local = np.array([np.nan if e is None else e for _, _, e in elevation_data])
+found = ~np.isnan(local)
+print("%d of %d points on tiles, %.2fms" % (found.sum(), len(local), elapsed * 1000))
+
+error = local[found] - reference[found]
+print("mean error:     %.2fm" % error.mean())
+print("mean abs error: %.2fm" % np.abs(error).mean())
+print("rms error:      %.2fm" % np.sqrt((error ** 2).mean()))
+print("max abs error:  %.2fm" % np.abs(error).max())
+print("gain/loss garmin: %.1f / %.1f" % elevation_gain_loss(reference[found].tolist()))
+print("gain/loss local:  %.1f / %.1f" % elevation_gain_loss(local[found].tolist()))
@@ -0,0 +1,36 @@
+"""
+How long requests wait for the Strava rate limits, simulated on a fake clock
+from noon UTC, with and without spreading the daily budget over the day.
+"""
+from swagger_client import rate_limit
+
+NOON = 100 * 24 * 60 * 60 + 12 * 60 * 60
+
+
+class Clock(object):
+    now = NOON
+
+
+rate_limit.time.time = lambda: Clock.now
+
+for short_limit, long_limit in [(100, 1000), (200, 2000)]:
+    for spread_daily in [False, True]:
+        Clock.now = NOON
+        limiter = rate_limit.RateLimiter(short_limit, long_limit, spread_daily)
+        for _ in range(60):
+            while True:
+                wait = limiter.try_acquire()
+                if wait <= 0:
+                    break
+                Clock.now += wait
+        print(
+            "limits %d/%d, spread_daily=%s: 60 requests in %.0fs, %d of the "
+            "daily budget left"
+            % (
+                short_limit,
+                long_limit,
+                spread_daily,
+                Clock.now - NOON,
+                limiter.metrics()["daily"]["remaining"],
+            )
+        )
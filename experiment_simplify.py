@@ -0,0 +1,44 @@
+"""
+How much the example course shrinks when it is simplified, and how much that
+changes its distance and elevation gain and loss, for a few tolerances. And a
+straight track that doubles back, which can't be simplified.
+"""
+import time
+
+import garmin.simplify
+from garmin.track import GeoTrack
+
+import examples.garmin_elevation_response
+
+track = GeoTrack.from_elevation_tuples(examples.garmin_elevation_response.get())
+
+for tolerance in [1, 2, 5, 10, 20]:
+    for elevations in [None, track.elevation]:
+        start = time.perf_counter()
+        keep, report = garmin.simplify.simplify(track, tolerance, elevations=elevations)
+        elapsed = time.perf_counter() - start
+        gain_error, loss_error = garmin.simplify.gain_loss_error(track.elevation, keep)
+        print(
+            "tolerance %4.1fm%s: %d -> %d points, distance %+.1fm (%+.3f%%), "
+            "gain %+.1fm, loss %+.1fm, %.2fms"
+            % (
+                report.tolerance,
+                "" if elevations is None else " (gain bounded)",
+                report.points,
+                report.simplified_points,
+                report.simplified_distance - report.distance,
+                100 * (report.simplified_distance - report.distance) / report.distance,
+                gain_error,
+                loss_error,
+                elapsed * 1000,
+            )
+        )
+
+# East, back west and east again, on one line: the turns lie on the
+# simplified line, so the distance can't be kept by dropping points.
+u_turn = GeoTrack([52.0] * 4, [5.0, 5.008, 5.002, 5.01])
+keep, report = garmin.simplify.simplify(u_turn, 5.0)
+print(
+    "u-turn: %d -> %d points, tolerance %.1fm"
+    % (report.points, report.simplified_points, report.tolerance)
+)
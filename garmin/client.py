@@ -13,6 +13,8 @@ import re
 import requests
 from io import BytesIO
 import sys
+import threading
+import uuid
 import zipfile
 import dateutil
 import dateutil.parser
@@ -20,6 +22,9 @@ import os.path
 from functools import wraps
 from builtins import range
 
+import garmin.course
+from atomic_write import write_atomically
+
 #
 # Note: For more detailed information about the API services
 # used by this module, log in to your Garmin Connect account
@@ -43,6 +48,11 @@ logging.getLogger("requests").setLevel(logging.ERROR)
 SSO_LOGIN_URL = "https://sso.garmin.com/sso/signin"
 """The Garmin Connect Single-Sign On login URL."""
 
+SSO_HOST = "https://sso.garmin.com"
+
+SESSION_PROBE_URL = "https://connect.garmin.com/modern/currentuser-service/user/info"
+"""A cheap request that only succeeds with a valid session."""
+
 
 def require_session(client_function):
     """Decorator that is used to annotate :class:`GarminClient`
@@ -61,6 +71,37 @@ def require_session(client_function):
     return check_session
 
 
+def _multipart_file(boundary, name, filename, chunks):
+    """Generate a multipart/form-data body with a single file field, without
+    joining the chunks of the file.
+    """
+    yield (
+        '--%s\r\nContent-Disposition: form-data; name="%s"; filename="%s"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n" % (boundary, name, filename)
+    ).encode()
+    for chunk in chunks:
+        yield chunk
+    yield ("\r\n--%s--\r\n" % boundary).encode()
+
+
+class _ReplayableStream(object):
+    """An iterable request body that is consumed from a generator the first
+    time, and replayed from the chunks seen so far after that. This lets
+    :meth:`GarminClient._request` retry a streaming upload.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._seen = []
+
+    def __iter__(self):
+        for chunk in self._seen:
+            yield chunk
+        for chunk in self._chunks:
+            self._seen.append(chunk)
+            yield chunk
+
+
 class GarminClient(object):
     """A client class used to authenticate with Garmin Connect and
     extract data from the user account.
@@ -76,16 +117,25 @@ class GarminClient(object):
                gpx = client.get_activity_gpx(activity_id)
     """
 
-    def __init__(self, username, password):
+    def __init__(self, username, password, cookie_path=None):
         """Initialize a :class:`GarminClient` instance.
         :param username: Garmin Connect user name or email address.
         :type username: str
         :param password: Garmin Connect account password.
         :type password: str
+        :param cookie_path: Optional file to persist the session cookies in,
+          so that a new process can reuse the session without logging in.
+        :type cookie_path: str
         """
         self.username = username
         self.password = password
+        self.cookie_path = cookie_path
         self.session = None
+        # The session may be used from several threads, which should not all
+        # authenticate again when it expires. The generation counts the
+        # authentications.
+        self._auth_lock = threading.Lock()
+        self._auth_generation = 0
 
     def __enter__(self):
         self.connect()
@@ -96,7 +146,12 @@ class GarminClient(object):
 
     def connect(self):
         self.session = requests.Session()
+        if self._load_cookies() and self._probe_session():
+            log.info("reusing persisted session")
+            return
+        self.session.cookies.clear()
         self._authenticate()
+        self._save_cookies()
 
     def disconnect(self):
         if self.session:
@@ -133,6 +188,75 @@ class GarminClient(object):
         # some form of legacy session. otherwise certain downloads will fail.
         self.session.get("https://connect.garmin.com/legacy/session")
 
+    def _probe_session(self):
+        try:
+            response = self.session.get(SESSION_PROBE_URL, headers={"nk": "NT"})
+        except requests.RequestException:
+            log.debug("session probe failed", exc_info=True)
+            return False
+        return response.status_code == 200 and not self._is_session_expired(response)
+
+    def _load_cookies(self):
+        """Load the persisted session cookies, if any. Returns whether there
+        were cookies to load.
+        """
+        if not self.cookie_path:
+            return False
+        try:
+            with open(self.cookie_path) as f:
+                cookies = json.load(f)
+        except (OSError, ValueError):
+            return False
+        for cookie in cookies:
+            self.session.cookies.set_cookie(requests.cookies.create_cookie(**cookie))
+        return bool(cookies)
+
+    def _save_cookies(self):
+        if not self.cookie_path:
+            return
+        cookies = [
+            {
+                "name": c.name,
+                "value": c.value,
+                "domain": c.domain,
+                "path": c.path,
+                "expires": c.expires,
+                "secure": c.secure,
+                "rest": c._rest,
+            }
+            for c in self.session.cookies
+        ]
+        # Other processes may be reading the file.
+        write_atomically(self.cookie_path, json.dumps(cookies))
+
+    def _is_session_expired(self, response):
+        """An expired session gets a 401/403, or is redirected to the SSO
+        login page.
+        """
+        if response.status_code in (401, 403):
+            return True
+        return any(
+            r.url.startswith(SSO_HOST) for r in response.history + [response]
+        )
+
+    def _request(self, method, url, **kwargs):
+        """Perform a request on the session. If the session turns out to be
+        expired, authenticate again and retry once.
+        """
+        generation = self._auth_generation
+        response = self.session.request(method, url, **kwargs)
+        if self._is_session_expired(response):
+            with self._auth_lock:
+                # Another thread may have authenticated in the meantime.
+                if self._auth_generation == generation:
+                    log.info("session expired, authenticating again ...")
+                    self.session.cookies.clear()
+                    self._authenticate()
+                    self._save_cookies()
+                    self._auth_generation += 1
+            response = self.session.request(method, url, **kwargs)
+        return response
+
     def _extract_auth_ticket_url(self, auth_response):
         """Extracts an authentication ticket URL from the response of an
         authentication form submission. The auth ticket URL is typically
@@ -149,20 +273,29 @@ class GarminClient(object):
         return auth_ticket_url
 
     @require_session
-    def import_course(self, byte_data):
-        data = {}
-        files = {"file": ("my-upload.tcx", byte_data, "application/octet-stream")}
-        response = self.session.post(
-            "https://connect.garmin.com/modern/proxy/course-service/course/import",
-            data=data,
-            files=files,
-            headers={"nk": "NT"},
+    def import_course(self, tcx):
+        """Upload a TCX file, to get it back as a course.
+        :param tcx: The file, as bytes or as an iterable of bytes chunks. Chunks
+          are streamed into the upload as they come in.
+        """
+        url = "https://connect.garmin.com/modern/proxy/course-service/course/import"
+        headers = {"nk": "NT"}
+        if isinstance(tcx, (bytes, bytearray, memoryview)):
+            files = {"file": ("my-upload.tcx", tcx, "application/octet-stream")}
+            return self._request("POST", url, data={}, files=files, headers=headers)
+
+        boundary = uuid.uuid4().hex
+        headers["Content-Type"] = "multipart/form-data; boundary=" + boundary
+        body = _ReplayableStream(
+            _multipart_file(boundary, "file", "my-upload.tcx", tcx)
         )
-        return response
+        return self._request("POST", url, data=body, headers=headers)
 
     @require_session
     def post_elevation(self, elevation_tuples):
-        response = self.session.post(
+        """Request the elevations of [latitude, longitude, None] tuples."""
+        response = self._request(
+            "POST",
             "https://connect.garmin.com/modern/proxy/course-service/course/elevation",
             json=elevation_tuples,
             headers={"nk": "NT"},
@@ -172,9 +305,10 @@ class GarminClient(object):
     @require_session
     def post_course(self, course):
 
-        response = self.session.post(
+        response = self._request(
+            "POST",
             "https://connect.garmin.com/modern/proxy/course-service/course/",
-            json=course,
+            json=garmin.course.course_to_json(course),
             headers={"nk": "NT"},
         )
         return response
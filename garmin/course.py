@@ -1,134 +1,143 @@
-import geopy.distance
+import numpy as np
+
+import garmin.geodesy
+import garmin.simplify
+import garmin.stats
+from garmin.elevation_analyzer import DEFAULT_THRESHOLD, elevation_gain_loss
+from garmin.track import GeoTrack
 
 
 def add_course_info(course, name, activity_type, elevation_data):
+    """
+    Fill in the course from the import response with everything Garmin needs
+    to save it. The geoPoints are stored as a GeoTrack; use course_to_json to
+    get the actual request body.
+    """
 
-    geopoints = elevation_tuples_to_geopoints(elevation_data)
-    add_distances_to_geopoints(geopoints)
-    elevations = list(p["elevation"] for p in geopoints)
+    track = GeoTrack.from_elevation_tuples(elevation_data)
+    stats = garmin.stats.track_stats(track)
+    track.distance = stats.distances
 
     course["activityTypePk"] = activity_type  # 1 is running, 10 is cycling
-    course["boundingBox"] = calculate_bounding_box(geopoints)
+    course["boundingBox"] = stats.bounding_box
     course["coordinateSystem"] = "WGS84"
     course["courseName"] = name
-    course["distanceMeter"] = geopoints[-1]["distance"]
-    course["elevationGainMeter"] = calculate_elevation_gain(elevations)
-    course["elevationLossMeter"] = calculate_elevation_loss(elevations)
-    course["geoPoints"] = geopoints
+    course["distanceMeter"] = stats.distance
+    course["elevationGainMeter"] = stats.elevation_gain
+    course["elevationLossMeter"] = stats.elevation_loss
+    course["geoPoints"] = track
     course["rulePK"] = 2
     course["sourceTypeId"] = 3
-    course["startPoint"] = pick_start_point(geopoints)
+    course["startPoint"] = stats.start_point
+
+
+def course_to_json(course):
+    """
+    The course as it should be posted to Garmin, with the geoPoints as a list
+    of dicts again.
+    """
+    geopoints = course.get("geoPoints")
+    if isinstance(geopoints, GeoTrack):
+        course = dict(course, geoPoints=geopoints.to_geopoints())
+    return course
 
 
 def geopoints_to_elevation_tuples(geopoints):
     """
-    Convert the list of geopoints to tuples for an elevation data request.
+    Convert the list of geopoints (or a GeoTrack) to tuples for an elevation
+    data request.
     """
+    if isinstance(geopoints, GeoTrack):
+        return geopoints.to_elevation_tuples()
     return list([point["latitude"], point["longitude"], None] for point in geopoints)
 
 
-def elevation_tuples_to_geopoints(r):
+def simplify_course(
+    course, tolerance=5.0, max_distance_error=0.002, elevation_provider=None
+):
     """
-    Convert a response from the elevation endpoint to a list of geopoints.
+    Drop the geoPoints of the course that are within `tolerance` meters of the
+    line through the others, keeping the distance within max_distance_error
+    of the original. Should be done before the elevations are looked up.
+    With a garmin.elevation.ElevationProvider, such as one of local elevation
+    tiles, the elevation gain and loss are also kept close to the original,
+    if it knows the elevations of all points. Otherwise the gain and loss are
+    not preserved. Returns a garmin.simplify.SimplifyReport.
     """
-    return list(
-        {"distance": None, "elevation": elevation, "latitude": lat, "longitude": lon}
-        for lat, lon, elevation in r
+    track = course["geoPoints"]
+    if not isinstance(track, GeoTrack):
+        track = GeoTrack.from_geopoints(track)
+    elevations = None
+    if elevation_provider is not None:
+        elevations = elevation_provider.elevations(track.latitude, track.longitude)
+        if np.isnan(elevations).any():
+            elevations = None
+    keep, report = garmin.simplify.simplify(
+        track, tolerance, max_distance_error, elevations
     )
+    course["geoPoints"] = track[keep]
+    return report
 
 
-def add_distances_to_geopoints(geopoints):
+def lookup_elevation(geopoints, provider):
+    """
+    Elevation data for the geopoints (or a GeoTrack) from a
+    garmin.elevation.ElevationProvider, in the format of Garmin's response to
+    an elevation data request.
+    """
+    if not isinstance(geopoints, GeoTrack):
+        geopoints = GeoTrack.from_geopoints(geopoints)
+    elevations = provider.elevations(geopoints.latitude, geopoints.longitude)
+    return [
+        [lat, lon, None if ele != ele else ele]
+        for lat, lon, ele in zip(
+            geopoints.latitude.tolist(),
+            geopoints.longitude.tolist(),
+            elevations.tolist(),
+        )
+    ]
+
+
+def add_distances_to_track(track, method="geodesic"):
     """
     Calculate cumulative distances using the WGS-84 ellipsoid, and add them to
-    the geopoints.
+    the track. See garmin.geodesy.cumulative_distances for the methods.
     """
-    prev = None
-    distance = 0  # meters
-    for p in geopoints:
-        cur = p["latitude"], p["longitude"]
-        if prev:
-            distance += geopy.distance.distance(prev, cur).m
-        p["distance"] = distance
-        prev = cur
+    track.distance = garmin.geodesy.cumulative_distances(
+        track.latitude, track.longitude, method
+    )
 
 
-def calculate_elevation_gain(elevations):
+def calculate_elevation_gain(elevations, threshold=DEFAULT_THRESHOLD):
     """
-    Based on the notifyNewPoint function of the elevation gain analyzer.
-    See https://gist.github.com/yoricksijsling/8abe7237e9930255e2eeceb63089dc29#file-module_20-js
-    and https://gist.github.com/yoricksijsling/8abe7237e9930255e2eeceb63089dc29#file-web-react_static_js_backbone_utils_elevationlossanalyzer-js
+    Elevation gain as calculated by Garmin, see garmin.elevation_analyzer.
     """
+    return elevation_gain_loss(elevations, threshold)[0]
 
-    threshold = 25
-
-    thresholdStartingPoint = elevations[0]
-    gain = 0
-    valueAgainstThreshold = 0
 
-    for elevation in elevations:
-        diff = elevation - thresholdStartingPoint
-        valueAgainstThreshold += diff
-        if abs(valueAgainstThreshold) >= threshold:
-            if valueAgainstThreshold > 0:
-                gain += diff
-            valueAgainstThreshold = 0
-            thresholdStartingPoint = elevation
-
-    return gain
-
-
-def calculate_elevation_loss(elevations):
+def calculate_elevation_loss(elevations, threshold=DEFAULT_THRESHOLD):
     """
-    Based on the notifyNewPoint function of the elevation loss analyzer.
-    See https://gist.github.com/yoricksijsling/8abe7237e9930255e2eeceb63089dc29#file-module_20-js
-    and https://gist.github.com/yoricksijsling/8abe7237e9930255e2eeceb63089dc29#file-web-react_static_js_backbone_utils_elevationlossanalyzer-js
+    Elevation loss as calculated by Garmin, see garmin.elevation_analyzer.
     """
+    return elevation_gain_loss(elevations, threshold)[1]
 
-    threshold = 25
-
-    thresholdStartingPoint = elevations[0]
-    loss = 0
-    valueAgainstThreshold = 0
-
-    for elevation in elevations:
-        diff = thresholdStartingPoint - elevation
-        valueAgainstThreshold += diff
-        if abs(valueAgainstThreshold) >= threshold:
-            if valueAgainstThreshold > 0:
-                loss += diff
-            valueAgainstThreshold = 0
-            thresholdStartingPoint = elevation
 
-    return loss
-
-
-def calculate_bounding_box(geopoints):
-    lat_min = min(p["latitude"] for p in geopoints)
-    lat_max = max(p["latitude"] for p in geopoints)
-    lon_min = min(p["longitude"] for p in geopoints)
-    lon_max = max(p["longitude"] for p in geopoints)
-
-    return {
-        "lowerLeft": {"latitude": lat_min, "longitude": lon_min},
-        "lowerLeftLatIsSet": True,
-        "lowerLeftLongIsSet": True,
-        "upperRight": {"latitude": lat_max, "longitude": lon_max},
-        "upperRightLatIsSet": True,
-        "upperRightLongIsSet": True,
-    }
+def calculate_bounding_box(track):
+    return garmin.stats.bounding_box(
+        track.latitude.min().item(),
+        track.latitude.max().item(),
+        track.longitude.min().item(),
+        track.longitude.max().item(),
+    )
 
 
-def pick_start_point(geopoints):
+def pick_start_point(track):
     """
     Pick one point as the start point. Garmin chooses a different point from the
     list actually. I _think_ it is used as the starting point for the view of
     the map, because they pick one that is reasonably close to the center.
     """
-    p = geopoints[0]
-    return {
-        "distance": p["distance"],
-        "elevation": p["elevation"],
-        "latitude": p["latitude"],
-        "longitude": p["longitude"],
-        "timestamp": None,
-    }
+    p = track[0]
+    return garmin.stats.start_point_dict(
+        p["latitude"], p["longitude"], p["elevation"], p["distance"]
+    )
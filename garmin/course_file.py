@@ -0,0 +1,133 @@
+"""
+Reading TCX and GPX files into courses, like Garmin's course import does.
+
+Uploading a file to Garmin's course/import endpoint only gives back the
+positions of its track points, as the geoPoints of an otherwise empty course.
+Parsing the file locally gives the same course without the round trip. The
+file is parsed incrementally as its chunks come in, and every track point is
+discarded once it is read, so memory use does not grow with the file.
+"""
+
+import xml.etree.ElementTree as ET
+
+# Tag (without namespace) of a track point, with a function that returns its
+# (latitude, longitude) text, or None if it has no position.
+POINT_TAGS = {
+    # TCX: <Trackpoint><Position><LatitudeDegrees>...
+    "Trackpoint": lambda e: _tcx_position(e),
+    # GPX: <trkpt lat=".." lon=".."> and <rtept lat=".." lon="..">
+    "trkpt": lambda e: (e.get("lat"), e.get("lon")),
+    "rtept": lambda e: (e.get("lat"), e.get("lon")),
+}
+
+
+def import_course(tcx):
+    """
+    The course that Garmin's course import returns for a TCX or GPX file.
+    :param tcx: The file, as bytes or as an iterable of bytes chunks.
+    """
+    return {
+        "activityTypePk": None,
+        "boundingBox": None,
+        "coordinateSystem": None,
+        "courseId": None,
+        "courseLines": None,
+        "courseName": None,
+        "coursePoints": None,
+        "createDate": None,
+        "description": None,
+        "displayName": None,
+        "distanceMeter": None,
+        "elapsedSeconds": None,
+        "elevationGainMeter": None,
+        "elevationLossMeter": None,
+        "firstName": None,
+        "geoPoints": list(iter_geopoints(tcx)),
+        "geoRoutePk": None,
+        "includeLaps": False,
+        "lastName": None,
+        "matchedToSegments": False,
+        "openStreetMap": False,
+        "originalCoordinateSystem": None,
+        "rulePK": None,
+        "sourcePk": None,
+        "sourceTypeId": None,
+        "speedMeterPerSecond": None,
+        "startPoint": None,
+        "targetCoordinateSystem": None,
+        "updateDate": None,
+        "userGroupPk": None,
+        "userProfilePk": None,
+        "virtualPartnerId": None,
+    }
+
+
+def iter_geopoints(chunks):
+    """
+    Generate a geoPoint for every track point with a position in a TCX or GPX
+    file. Like in Garmin's import response, only the position is filled in.
+    :param chunks: The file, as bytes or as an iterable of bytes chunks.
+    """
+    for latitude, longitude in iter_positions(chunks):
+        yield {
+            "distance": None,
+            "elevation": None,
+            "latitude": latitude,
+            "longitude": longitude,
+            "timestamp": None,
+        }
+
+
+def iter_positions(chunks):
+    """
+    Generate (latitude, longitude) of the track points in a TCX or GPX file.
+    :param chunks: The file, as bytes or as an iterable of bytes chunks.
+    """
+    if isinstance(chunks, (bytes, bytearray, memoryview)):
+        chunks = [chunks]
+    parser = ET.XMLPullParser(events=("start", "end"))
+    # The element that contains the track points, from which they are removed
+    # after they are read.
+    parents = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        for position in _read_events(parser, parents):
+            yield position
+    parser.close()
+    for position in _read_events(parser, parents):
+        yield position
+
+
+def _read_events(parser, parents):
+    for event, element in parser.read_events():
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        read_position = POINT_TAGS.get(_local_name(element.tag))
+        if read_position is None:
+            continue
+        position = read_position(element)
+        if parents:
+            parents[-1].remove(element)
+        if position is None or None in position:
+            continue
+        yield float(position[0]), float(position[1])
+
+
+def _tcx_position(trackpoint):
+    for child in trackpoint:
+        if _local_name(child.tag) == "Position":
+            latitude = longitude = None
+            for coordinate in child:
+                name = _local_name(coordinate.tag)
+                if name == "LatitudeDegrees":
+                    latitude = coordinate.text
+                elif name == "LongitudeDegrees":
+                    longitude = coordinate.text
+            return latitude, longitude
+    return None
+
+
+def _local_name(tag):
+    return tag.rpartition("}")[2]
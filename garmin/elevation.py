@@ -0,0 +1,242 @@
+"""
+Providers of the elevation of points, for the elevation profile of a course.
+
+Garmin fills in elevations through its course/elevation endpoint, which takes
+and returns every point of the course. With a directory of SRTM tiles the
+elevations can be looked up locally instead, with Garmin as a fallback for
+points that are not covered by the tiles.
+
+The tiles are .hgt files as distributed for SRTM, named after their south west
+corner (e.g. N52E005.hgt), with 1201x1201 (3 arc second) or 3601x3601 (1 arc
+second) big-endian 16 bit samples. Other DEMs such as Copernicus GLO-30 can be
+converted with `gdal_translate -of SRTMHGT`.
+"""
+
+import collections
+import logging
+import os.path
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+log = logging.getLogger(__name__)
+
+VOID = -32768
+"""The value of samples without data in .hgt tiles."""
+
+
+class ElevationProvider(object):
+    """Looks up the elevation of points."""
+
+    def elevations(self, latitudes, longitudes):
+        """
+        The elevations in meters of the points, as an array of floats, with NaN
+        where the elevation is unknown.
+        :param latitudes: Array-like of latitudes in degrees.
+        :param longitudes: Array-like of longitudes in degrees.
+        """
+        raise NotImplementedError()
+
+
+class GarminElevationProvider(ElevationProvider):
+    """Elevations from Garmin's course/elevation endpoint.
+
+    Long courses are split into chunks, which are requested concurrently over
+    the session of the client. A chunk that fails with a connection error, a
+    server error or a 429 is retried on its own, after a backoff.
+    :param client: A connected GarminClient.
+    :param chunk_size: The maximum number of points per request.
+    :param workers: The maximum number of concurrent requests.
+    :param retries: The number of retries per chunk.
+    :param backoff: Seconds to wait before the first retry, doubled for every
+      next one.
+    """
+
+    def __init__(self, client, chunk_size=5000, workers=4, retries=2, backoff=1.0):
+        self.client = client
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+
+    def elevations(self, latitudes, longitudes):
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        chunks = [
+            (
+                latitudes[start : start + self.chunk_size],
+                longitudes[start : start + self.chunk_size],
+            )
+            for start in range(0, len(latitudes), self.chunk_size)
+        ]
+        if not chunks:
+            return np.empty(0)
+        if len(chunks) == 1:
+            return self._chunk_elevations(chunks[0])
+        log.info("requesting %d elevations in %d chunks", len(latitudes), len(chunks))
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # map returns the results in the order of the chunks.
+            return np.concatenate(list(executor.map(self._chunk_elevations, chunks)))
+
+    def _chunk_elevations(self, chunk):
+        latitudes, longitudes = chunk
+        elevation_tuples = [
+            [latitude, longitude, None]
+            for latitude, longitude in zip(latitudes.tolist(), longitudes.tolist())
+        ]
+        attempt = 0
+        while True:
+            try:
+                response = self.client.post_elevation(elevation_tuples)
+                response.raise_for_status()
+                elevation_data = response.json()
+                if len(elevation_data) != len(elevation_tuples):
+                    raise ValueError(
+                        "got %d elevations for %d points"
+                        % (len(elevation_data), len(elevation_tuples))
+                    )
+            except (requests.RequestException, ValueError) as e:
+                if attempt >= self.retries or not _is_transient(e):
+                    raise
+                delay = self.backoff * 2 ** attempt
+                log.warning("elevation request failed (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            return np.array(
+                [np.nan if e is None else e for _, _, e in elevation_data], dtype=float
+            )
+
+
+class HgtElevationProvider(ElevationProvider):
+    """Elevations from memory mapped .hgt tiles, bilinearly interpolated
+    between the four surrounding samples. Points on missing tiles or next to
+    voids get NaN.
+    :param directory: The directory with the tiles.
+    :param cache_size: The number of tiles to keep mapped.
+    """
+
+    def __init__(self, directory, cache_size=16):
+        self.directory = directory
+        self.cache_size = cache_size
+        # Least recently used first. Missing tiles are cached as None.
+        self._tiles = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def elevations(self, latitudes, longitudes):
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        result = np.full(len(latitudes), np.nan)
+
+        valid = np.isfinite(latitudes) & np.isfinite(longitudes)
+        (indices,) = np.nonzero(valid)
+        south = np.floor(latitudes[indices]).astype(int)
+        west = np.floor(longitudes[indices]).astype(int)
+        # One lookup per tile, for all points on it.
+        keys, inverse = np.unique((south + 90) * 360 + (west + 180), return_inverse=True)
+        for i, key in enumerate(keys.tolist()):
+            tile_south, tile_west = key // 360 - 90, key % 360 - 180
+            samples = self._tile(tile_south, tile_west)
+            if samples is None:
+                continue
+            on_tile = indices[inverse == i]
+            result[on_tile] = _bilinear(
+                samples,
+                latitudes[on_tile] - tile_south,
+                longitudes[on_tile] - tile_west,
+            )
+        return result
+
+    def _tile(self, south, west):
+        key = (south, west)
+        with self._lock:
+            try:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+            except KeyError:
+                pass
+            samples = self._load(south, west)
+            self._tiles[key] = samples
+            while len(self._tiles) > self.cache_size:
+                self._tiles.popitem(last=False)
+            return samples
+
+    def _load(self, south, west):
+        path = os.path.join(self.directory, tile_name(south, west))
+        try:
+            size = int(round((os.path.getsize(path) // 2) ** 0.5))
+        except OSError:
+            log.info("no elevation tile %s", path)
+            return None
+        return np.memmap(path, dtype=">i2", mode="r", shape=(size, size))
+
+
+class FallbackElevationProvider(ElevationProvider):
+    """Elevations from `primary`, and from `fallback` for the points for which
+    the primary provider has none.
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+
+    def elevations(self, latitudes, longitudes):
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        result = self.primary.elevations(latitudes, longitudes)
+        missing = np.isnan(result)
+        if missing.any():
+            log.info(
+                "%d of %d elevations from fallback", np.count_nonzero(missing), len(result)
+            )
+            result[missing] = self.fallback.elevations(
+                latitudes[missing], longitudes[missing]
+            )
+        return result
+
+
+def _is_transient(error):
+    """Whether a failed elevation request may succeed when it is retried."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return True
+    return response.status_code == 429 or response.status_code >= 500
+
+
+def tile_name(south, west):
+    """The name of the .hgt tile with the given south west corner."""
+    return "%s%02d%s%03d.hgt" % (
+        "N" if south >= 0 else "S",
+        abs(south),
+        "E" if west >= 0 else "W",
+        abs(west),
+    )
+
+
+def _bilinear(samples, dlat, dlon):
+    """Interpolate the samples of a tile at offsets from its south west corner,
+    in degrees. The first row of a tile is its north edge.
+    """
+    n = samples.shape[0] - 1
+    y = (1 - dlat) * n
+    x = dlon * n
+    y0 = np.clip(np.floor(y).astype(int), 0, n - 1)
+    x0 = np.clip(np.floor(x).astype(int), 0, n - 1)
+    fy = y - y0
+    fx = x - x0
+
+    corners = np.stack(
+        [
+            samples[y0, x0],
+            samples[y0, x0 + 1],
+            samples[y0 + 1, x0],
+            samples[y0 + 1, x0 + 1],
+        ]
+    ).astype(float)
+    corners[corners == VOID] = np.nan
+    top = corners[0] * (1 - fx) + corners[1] * fx
+    bottom = corners[2] * (1 - fx) + corners[3] * fx
+    return top * (1 - fy) + bottom * fy
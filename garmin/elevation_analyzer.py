@@ -0,0 +1,117 @@
+"""
+Elevation gain and loss the way Garmin Connect calculates them.
+
+Based on the notifyNewPoint functions of the elevation gain and loss analyzers.
+See https://gist.github.com/yoricksijsling/8abe7237e9930255e2eeceb63089dc29#file-module_20-js
+and https://gist.github.com/yoricksijsling/8abe7237e9930255e2eeceb63089dc29#file-web-react_static_js_backbone_utils_elevationlossanalyzer-js
+
+Both analyzers sum the differences to a starting point until that sum passes a
+threshold, then count the last difference as gain or loss and restart from the
+current point. They reset at the same points, so gain and loss can be
+calculated together.
+"""
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 25  # meters
+
+
+class ElevationAnalyzer(object):
+    """
+    Incremental gain and loss analyzer. Feed it elevations one at a time with
+    add(), and read gain and loss at any moment.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.gain = 0
+        self.loss = 0
+        self._threshold_start = None
+        self._value_against_threshold = 0
+
+    def add(self, elevation):
+        if self._threshold_start is None:
+            self._threshold_start = elevation
+        diff = elevation - self._threshold_start
+        self._value_against_threshold += diff
+        if abs(self._value_against_threshold) >= self.threshold:
+            if self._value_against_threshold > 0:
+                self.gain += diff
+            else:
+                self.loss -= diff
+            self._value_against_threshold = 0
+            self._threshold_start = elevation
+
+    def extend(self, elevations):
+        for elevation in elevations:
+            self.add(elevation)
+
+
+def elevation_gain_loss(elevations, threshold=DEFAULT_THRESHOLD, method="auto"):
+    """
+    Calculate (gain, loss) of a sequence of elevations.
+
+    method is "python", "numpy" or "auto". Both give exactly the same results.
+    The NumPy implementation searches for each reset point with a vectorized
+    cumulative sum, which only pays off when there are many points between
+    resets, as with densely sampled tracks. "auto" estimates that from the
+    average step between points.
+    """
+    if method == "auto":
+        method = "python"
+        if len(elevations) >= 1024:
+            array = np.asarray(elevations, dtype=np.float64)
+            # Between resets the sum grows roughly with step * n^2 / 2, we
+            # want the numpy version if that takes more than ~32 points.
+            if np.abs(np.diff(array)).mean() * 512 < threshold:
+                method = "numpy"
+                elevations = array
+
+    if method == "numpy":
+        return _gain_loss_numpy(np.asarray(elevations, dtype=np.float64), threshold)
+    elif method == "python":
+        if isinstance(elevations, np.ndarray):
+            elevations = elevations.tolist()
+        analyzer = ElevationAnalyzer(threshold)
+        analyzer.extend(elevations)
+        return analyzer.gain, analyzer.loss
+    else:
+        raise ValueError("unknown method %r" % method)
+
+
+def _gain_loss_numpy(elevations, threshold, window=32):
+    n = len(elevations)
+    gain = loss = 0
+    if not n:
+        return gain, loss
+    start = 0  # index of the current threshold starting point
+    size = window
+    while True:
+        start_elevation = elevations[start]
+        reset = None
+        offset = 0.0
+        i = start + 1
+        while i < n:
+            # Accumulating in the same order as the python version keeps the
+            # results bit for bit identical.
+            diffs = elevations[i : i + size] - start_elevation
+            diffs[0] += offset
+            values = np.cumsum(diffs)
+            hits = np.flatnonzero(np.abs(values) >= threshold)
+            if hits.size:
+                reset = i + hits[0]
+                value_against_threshold = values[hits[0]]
+                break
+            offset = values[-1]
+            i += size
+            size *= 2
+        if reset is None:
+            return gain, loss
+
+        diff = elevations[reset].item() - start_elevation.item()
+        if value_against_threshold > 0:
+            gain += diff
+        else:
+            loss -= diff
+        size = max(window, 2 * (reset - start))
+        start = reset
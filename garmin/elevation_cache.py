@@ -0,0 +1,159 @@
+"""
+A persistent cache of elevations, in front of an elevation provider.
+
+Routes often share roads, so the same points are looked up again and again.
+Elevations are stored in SQLite, keyed by the position rounded to 5 decimals
+(about a meter), which is the precision of the positions Garmin returns. Only
+the positions that are not cached are sent to the provider, each once, in a
+single request. When the cache grows beyond its size, the least recently used
+positions are evicted.
+"""
+
+import logging
+import time
+
+import numpy as np
+
+import database
+from garmin.elevation import ElevationProvider
+
+log = logging.getLogger(__name__)
+
+PRECISION = 5
+"""Decimals of the positions in the cache keys."""
+
+_SCALE = 10 ** PRECISION
+# The quantized latitude and longitude are combined into one integer key.
+_LATITUDE_OFFSET = 90 * _SCALE
+_LONGITUDE_OFFSET = 180 * _SCALE
+_LONGITUDE_RANGE = 360 * _SCALE + 1
+
+
+class ElevationCache(object):
+    """Elevations by position in an SQLite database, which may be shared
+    between threads and processes.
+    :param path: The database file.
+    :param max_entries: The number of positions to keep.
+    """
+
+    def __init__(self, path, max_entries=1000000):
+        self.path = path
+        self.max_entries = max_entries
+        with database.connect(self.path) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS elevation ("
+                " key INTEGER PRIMARY KEY,"
+                " elevation REAL NOT NULL,"
+                " used REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS elevation_used ON elevation (used)"
+            )
+
+    def get(self, keys):
+        """
+        The cached elevations for the keys, with NaN for misses. Hits are
+        marked as used.
+        :param keys: Array of distinct keys, see position_keys.
+        """
+        result = np.full(len(keys), np.nan)
+        if not len(keys):
+            return result
+        keys = keys.tolist()
+        with database.connect(self.path) as connection:
+            connection.execute("CREATE TEMP TABLE wanted (key INTEGER PRIMARY KEY)")
+            connection.executemany(
+                "INSERT INTO wanted VALUES (?)", ((key,) for key in keys)
+            )
+            found = dict(
+                connection.execute(
+                    "SELECT e.key, e.elevation FROM elevation e"
+                    " JOIN wanted w ON e.key = w.key"
+                )
+            )
+            connection.execute(
+                "UPDATE elevation SET used = ?"
+                " WHERE key IN (SELECT key FROM wanted)",
+                (time.time(),),
+            )
+            connection.execute("DROP TABLE wanted")
+        for i, key in enumerate(keys):
+            if key in found:
+                result[i] = found[key]
+        return result
+
+    def put(self, keys, elevations):
+        """
+        Store elevations, and evict the least recently used positions if the
+        cache is full. NaN elevations are not stored.
+        """
+        now = time.time()
+        rows = [
+            (key, elevation, now)
+            for key, elevation in zip(keys.tolist(), elevations.tolist())
+            if elevation == elevation
+        ]
+        if not rows:
+            return
+        with database.connect(self.path) as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO elevation VALUES (?, ?, ?)", rows
+            )
+            (count,) = connection.execute("SELECT COUNT(*) FROM elevation").fetchone()
+            if count > self.max_entries:
+                log.info("evicting %d elevations", count - self.max_entries)
+                connection.execute(
+                    "DELETE FROM elevation WHERE key IN"
+                    " (SELECT key FROM elevation ORDER BY used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+
+class CachedElevationProvider(ElevationProvider):
+    """Elevations from the cache, and from `provider` for the positions that
+    are not in the cache yet.
+    :param provider: The ElevationProvider to look up misses with.
+    :param cache: An ElevationCache.
+    """
+
+    def __init__(self, provider, cache):
+        self.provider = provider
+        self.cache = cache
+
+    def elevations(self, latitudes, longitudes):
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        result = np.full(len(latitudes), np.nan)
+        valid = np.isfinite(latitudes) & np.isfinite(longitudes)
+        (indices,) = np.nonzero(valid)
+
+        # Every distinct position is looked up once.
+        keys, first, inverse = np.unique(
+            position_keys(latitudes[indices], longitudes[indices]),
+            return_index=True,
+            return_inverse=True,
+        )
+        elevations = self.cache.get(keys)
+        (missing,) = np.nonzero(np.isnan(elevations))
+        log.info(
+            "%d of %d positions cached", len(keys) - len(missing), len(keys)
+        )
+        if len(missing):
+            # Send the positions as they were given, not the rounded ones.
+            points = indices[first[missing]]
+            elevations[missing] = self.provider.elevations(
+                latitudes[points], longitudes[points]
+            )
+            self.cache.put(keys[missing], elevations[missing])
+
+        result[indices] = elevations[inverse]
+        return result
+
+
+def position_keys(latitudes, longitudes):
+    """Cache keys for positions, as an array of integers."""
+    latitudes = np.round(np.asarray(latitudes, dtype=float) * _SCALE).astype(np.int64)
+    longitudes = np.round(np.asarray(longitudes, dtype=float) * _SCALE).astype(np.int64)
+    return (latitudes + _LATITUDE_OFFSET) * _LONGITUDE_RANGE + (
+        longitudes + _LONGITUDE_OFFSET
+    )
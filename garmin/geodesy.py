@@ -0,0 +1,173 @@
+"""
+Batched distance calculations on the WGS-84 ellipsoid.
+
+All functions take whole sequences of latitudes and longitudes (in degrees) at
+once, so a course with tens of thousands of points is handled in a handful of
+NumPy operations instead of one geopy call per segment.
+"""
+
+import geopy.distance
+import numpy as np
+
+# WGS-84 ellipsoid, the same one geopy uses by default.
+A = 6378137.0  # semi-major axis, meters
+F = 1 / 298.257223563  # flattening
+B = A * (1 - F)  # semi-minor axis, meters
+
+# Mean earth radius, used by the haversine approximation.
+R = (2 * A + B) / 3
+
+METHODS = ("geodesic", "andoyer", "haversine")
+
+
+def cumulative_distances(latitudes, longitudes, method="geodesic"):
+    """
+    Calculate the cumulative distance in meters along a sequence of points.
+
+    The result has the same length as the input and starts at 0.
+
+    method can be one of:
+     - "geodesic": exact ellipsoidal distance (vectorized Vincenty inverse,
+       matching geopy.distance.distance to well below a millimeter per segment)
+     - "andoyer": Andoyer-Lambert first order flattening correction, a few
+       meters of error per 100km
+     - "haversine": spherical distance, up to 0.5% error
+    """
+    lats = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lons = np.radians(np.asarray(longitudes, dtype=np.float64))
+
+    distances = np.zeros(len(lats))
+    if len(lats) > 1:
+        segments = segment_distances(lats[:-1], lons[:-1], lats[1:], lons[1:], method)
+        np.cumsum(segments, out=distances[1:])
+    return distances
+
+
+def segment_distances(lat1, lon1, lat2, lon2, method="geodesic"):
+    """
+    Calculate the distances in meters between two arrays of points, pairwise.
+    Coordinates are in radians.
+    """
+    if method == "geodesic":
+        return _vincenty(lat1, lon1, lat2, lon2)
+    elif method == "andoyer":
+        return _andoyer_lambert(lat1, lon1, lat2, lon2)
+    elif method == "haversine":
+        return R * _central_angle(lat1, lon1, lat2, lon2)
+    else:
+        raise ValueError(
+            "unknown distance method %r, expected one of %s" % (method, METHODS)
+        )
+
+
+def _central_angle(lat1, lon1, lat2, lon2):
+    """
+    The haversine formula for the angle between two points on a sphere.
+    """
+    h = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+
+def _andoyer_lambert(lat1, lon1, lat2, lon2):
+    """
+    Spherical distance on the parametric latitudes, corrected for the
+    flattening of the ellipsoid.
+    """
+    beta1 = np.arctan((1 - F) * np.tan(lat1))
+    beta2 = np.arctan((1 - F) * np.tan(lat2))
+    sigma = _central_angle(beta1, lon1, beta2, lon2)
+
+    p = (beta1 + beta2) / 2
+    q = (beta2 - beta1) / 2
+    sin_sigma = np.sin(sigma)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (
+            (sigma - sin_sigma)
+            * (np.sin(p) * np.cos(q)) ** 2
+            / np.cos(sigma / 2) ** 2
+        )
+        y = (
+            (sigma + sin_sigma)
+            * (np.cos(p) * np.sin(q)) ** 2
+            / np.sin(sigma / 2) ** 2
+        )
+    correction = np.where(sigma > 0, F / 2 * (x + y), 0.0)
+    return A * (sigma - correction)
+
+
+def _vincenty(lat1, lon1, lat2, lon2, tolerance=1e-12, max_iterations=200):
+    """
+    Vincenty's inverse formula, iterated for all segments at once. Segments
+    that don't converge (nearly antipodal points) fall back to geopy.
+    """
+    u1 = np.arctan((1 - F) * np.tan(lat1))
+    u2 = np.arctan((1 - F) * np.tan(lat2))
+    sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+    sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+
+    lon_diff = lon2 - lon1
+    lam = lon_diff
+    converged = np.zeros(len(lam), dtype=bool)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(max_iterations):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(
+                cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam
+            )
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(
+                sin_sigma > 0, cos_u1 * cos_u2 * sin_lam / sin_sigma, 0.0
+            )
+            cos2_alpha = 1 - sin_alpha ** 2
+            # Points on the equator have cos2_alpha == 0.
+            cos_2sigma_m = np.where(
+                cos2_alpha > 0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha, 0.0
+            )
+            c = F / 16 * cos2_alpha * (4 + F * (4 - 3 * cos2_alpha))
+            lam_prev = lam
+            lam = lon_diff + (1 - c) * F * sin_alpha * (
+                sigma
+                + c
+                * sin_sigma
+                * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            converged = np.abs(lam - lam_prev) <= tolerance
+            if converged.all():
+                break
+
+        u_sq = cos2_alpha * (A ** 2 - B ** 2) / B ** 2
+        big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = (
+            big_b
+            * sin_sigma
+            * (
+                cos_2sigma_m
+                + big_b
+                / 4
+                * (
+                    cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+                    - big_b
+                    / 6
+                    * cos_2sigma_m
+                    * (-3 + 4 * sin_sigma ** 2)
+                    * (-3 + 4 * cos_2sigma_m ** 2)
+                )
+            )
+        )
+        distances = B * big_a * (sigma - delta_sigma)
+
+    # Coincident points give sin_sigma == 0, which is fine: the distance is 0.
+    distances = np.where(sin_sigma > 0, distances, 0.0)
+
+    for i in np.flatnonzero(~converged | ~np.isfinite(distances)):
+        distances[i] = geopy.distance.distance(
+            (np.degrees(lat1[i]), np.degrees(lon1[i])),
+            (np.degrees(lat2[i]), np.degrees(lon2[i])),
+        ).m
+    return distances
@@ -0,0 +1,98 @@
+"""
+A pool of authenticated GarminClients that are kept alive between requests.
+
+Logging in to Garmin Connect takes three requests, so instead of connecting for
+every copy we keep the sessions (and their keep-alive connections) around.
+Expired sessions are detected and re-authenticated by the client itself. With
+a cookie_path, the session is also reused across processes and restarts.
+"""
+
+import contextlib
+import logging
+import queue
+import threading
+
+import requests
+
+from garmin.client import GarminClient
+
+log = logging.getLogger(__name__)
+
+
+class GarminClientPool(object):
+    """Hands out connected :class:`GarminClient` instances, one borrower at a
+    time per client. Clients are created lazily, up to `size` of them.
+    Example of use: ::
+      pool = GarminClientPool("my.sample@sample.com", "secretpassword")
+      with pool.client() as client:
+          client.import_course(tcx_bytes)
+    """
+
+    def __init__(self, username, password, size=4, cookie_path=None):
+        self.username = username
+        self.password = password
+        self.size = size
+        self.cookie_path = cookie_path
+        # Last in, first out, so that the most recently used session is reused
+        # and idle ones can expire without being used.
+        self._idle = queue.LifoQueue()
+        # One permit per client that is handed out, a new client is only
+        # created when there are no idle ones.
+        self._permits = threading.BoundedSemaphore(size)
+
+    @contextlib.contextmanager
+    def client(self):
+        self._permits.acquire()
+        try:
+            client = self._acquire()
+        except Exception:
+            self._permits.release()
+            raise
+
+        try:
+            yield client
+        except Exception as e:
+            if _is_client_error(e):
+                # The session may be in a bad state, don't hand it out again.
+                client.disconnect()
+            else:
+                self._idle.put(client)
+            raise
+        else:
+            self._idle.put(client)
+        finally:
+            self._permits.release()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            log.info("creating new garmin client")
+            client = GarminClient(self.username, self.password, self.cookie_path)
+            client.connect()
+            return client
+
+    def close(self):
+        """Disconnect all idle clients."""
+        while True:
+            try:
+                client = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            client.disconnect()
+
+
+def _is_client_error(error):
+    """
+    Whether an error came from a call on a GarminClient, or from one of its
+    responses. Other errors, e.g. of Strava, whose client is not built on
+    requests, say nothing about the Garmin session.
+    """
+    if isinstance(error, requests.RequestException):
+        return True
+    traceback = error.__traceback__
+    while traceback is not None:
+        if traceback.tb_frame.f_globals.get("__name__") == GarminClient.__module__:
+            return True
+        traceback = traceback.tb_next
+    return False
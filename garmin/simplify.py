@@ -0,0 +1,178 @@
+"""
+Simplification of tracks with the Douglas-Peucker algorithm.
+
+Routes drawn on Strava have a point at every bend of the road, often many more
+than a device needs to navigate. Dropping the points that lie within a few
+meters of the line through their neighbours makes every request with the
+course smaller, and long courses loadable on devices.
+
+Dropping points shortens the track a little, because the simplified line cuts
+corners. The tolerance is halved until the distance is within a bound of the
+original. With the elevations of the points, e.g. from local elevation tiles,
+it is also halved until the elevation gain and loss are within a bound of the
+original; without them, the gain and loss are not preserved. A track that
+doubles back on a straight line never gets there, since
+the point where it turns lies on the line, so below MIN_TOLERANCE all points
+are kept.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+import garmin.geodesy
+from garmin.elevation_analyzer import DEFAULT_THRESHOLD, elevation_gain_loss
+
+MIN_TOLERANCE = 0.01
+"""The tolerance in meters below which simplifying is given up."""
+
+SimplifyReport = namedtuple(
+    "SimplifyReport",
+    [
+        "points",  # number of points before and after
+        "simplified_points",
+        "tolerance",  # the tolerance that was used, in meters
+        "distance",  # in meters, before and after
+        "simplified_distance",
+        "gain",  # elevation gain and loss in meters, None if not known
+        "loss",
+        "gain_error",  # simplified minus original, None if not known
+        "loss_error",
+    ],
+)
+
+
+def simplify(
+    track,
+    tolerance=5.0,
+    max_distance_error=0.002,
+    elevations=None,
+    max_gain_error=0.05,
+    threshold=DEFAULT_THRESHOLD,
+):
+    """
+    The indices of the points of a GeoTrack to keep, and a SimplifyReport.
+    :param tolerance: The maximum distance in meters of a dropped point to the
+      simplified track.
+    :param max_distance_error: The maximum relative difference between the
+      distance of the simplified and the original track.
+    :param elevations: The elevations of all points, or None. Without them
+      the elevation gain and loss are not bounded.
+    :param max_gain_error: The maximum relative difference between the
+      elevation gain, and the loss, of the simplified and the original track.
+    :param threshold: The threshold of the elevation gain and loss, see
+      garmin.elevation_analyzer.
+    """
+    x, y = _project(track.latitude, track.longitude)
+    distance = _length(track.latitude, track.longitude)
+    gain = loss = gain_error = loss_error = None
+    if elevations is not None:
+        elevations = np.asarray(elevations, dtype=float)
+        gain, loss = elevation_gain_loss(elevations, threshold)
+    while True:
+        if tolerance < MIN_TOLERANCE:
+            keep = np.arange(len(track))
+            tolerance = 0.0
+            simplified_distance = distance
+            if elevations is not None:
+                gain_error = loss_error = 0.0
+            break
+        keep = np.nonzero(douglas_peucker(x, y, tolerance))[0]
+        simplified_distance = _length(track.latitude[keep], track.longitude[keep])
+        within_bounds = distance - simplified_distance <= max_distance_error * distance
+        if elevations is not None:
+            gain_error, loss_error = gain_loss_error(elevations, keep, threshold)
+            within_bounds = (
+                within_bounds
+                and abs(gain_error) <= max_gain_error * gain
+                and abs(loss_error) <= max_gain_error * loss
+            )
+        if within_bounds or len(keep) == len(track):
+            break
+        tolerance /= 2
+    return keep, SimplifyReport(
+        len(track),
+        len(keep),
+        tolerance,
+        distance,
+        simplified_distance,
+        gain,
+        loss,
+        gain_error,
+        loss_error,
+    )
+
+
+def douglas_peucker(x, y, tolerance):
+    """
+    A boolean mask of the points to keep of the line through the points
+    (x, y), in a plane. The first and last point are always kept.
+    """
+    n = len(x)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    # The segments (first, last) that still have to be checked. Every check
+    # computes the distances of all points in between at once.
+    segments = [(0, n - 1)]
+    while segments:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+        distances = _distances_to_segment(
+            x[first + 1 : last],
+            y[first + 1 : last],
+            x[first],
+            y[first],
+            x[last],
+            y[last],
+        )
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            segments.append((first, split))
+            segments.append((split, last))
+    return keep
+
+
+def gain_loss_error(elevations, keep, threshold=DEFAULT_THRESHOLD):
+    """
+    The elevation (gain, loss) of the points that are kept minus that of all
+    points, for when the elevations of all points are known.
+    """
+    elevations = np.asarray(elevations, dtype=float)
+    gain, loss = elevation_gain_loss(elevations, threshold)
+    simplified_gain, simplified_loss = elevation_gain_loss(elevations[keep], threshold)
+    return simplified_gain - gain, simplified_loss - loss
+
+
+def _project(latitudes, longitudes):
+    """Equirectangular projection to meters, accurate enough at route scale."""
+    if not len(latitudes):
+        return latitudes, longitudes
+    latitudes = np.radians(latitudes)
+    longitudes = np.radians(longitudes)
+    x = garmin.geodesy.R * longitudes * np.cos(np.mean(latitudes))
+    y = garmin.geodesy.R * latitudes
+    return x, y
+
+
+def _length(latitudes, longitudes):
+    if len(latitudes) < 2:
+        return 0.0
+    return float(
+        garmin.geodesy.cumulative_distances(latitudes, longitudes, "andoyer")[-1]
+    )
+
+
+def _distances_to_segment(x, y, x1, y1, x2, y2):
+    dx = x2 - x1
+    dy = y2 - y1
+    length_squared = dx * dx + dy * dy
+    if length_squared == 0:
+        # A closed loop, measure from the point itself.
+        return np.hypot(x - x1, y - y1)
+    t = np.clip(((x - x1) * dx + (y - y1) * dy) / length_squared, 0, 1)
+    return np.hypot(x - (x1 + t * dx), y - (y1 + t * dy))
@@ -0,0 +1,144 @@
+"""
+Course statistics computed in a single pass over the points.
+
+The results are the same as those of the separate functions in garmin.course
+(calculate_elevation_gain, calculate_elevation_loss, calculate_bounding_box,
+...), which each walk the points again.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+import garmin.geodesy
+from garmin.elevation_analyzer import DEFAULT_THRESHOLD, ElevationAnalyzer
+from garmin.elevation_analyzer import elevation_gain_loss
+
+CourseStats = namedtuple(
+    "CourseStats",
+    [
+        "distances",  # cumulative distance per point, in meters
+        "distance",
+        "elevation_gain",
+        "elevation_loss",
+        "bounding_box",
+        "start_point",
+    ],
+)
+
+
+def course_stats(
+    points, threshold=DEFAULT_THRESHOLD, method="geodesic", block_size=4096
+):
+    """
+    Compute the course statistics in one traversal of an iterable of
+    (latitude, longitude, elevation) tuples. The points may come from a
+    generator; only one block of coordinates is kept in memory for the
+    distance calculation.
+    """
+    distances = []
+    distance = 0.0
+    block_lats, block_lons = [], []
+
+    def flush():
+        nonlocal distance
+        lats = np.radians(block_lats)
+        lons = np.radians(block_lons)
+        segments = garmin.geodesy.segment_distances(
+            lats[:-1], lons[:-1], lats[1:], lons[1:], method
+        )
+        for d in segments.tolist():
+            distance += d
+            distances.append(distance)
+        # Keep the last point, it starts the first segment of the next block.
+        del block_lats[:-1], block_lons[:-1]
+
+    start_point = None
+    lat_min = lon_min = float("inf")
+    lat_max = lon_max = float("-inf")
+    analyzer = ElevationAnalyzer(threshold)
+    for lat, lon, elevation in points:
+        if start_point is None:
+            start_point = (lat, lon, elevation)
+            distances.append(distance)
+        elif len(block_lats) >= block_size:
+            flush()
+        block_lats.append(lat)
+        block_lons.append(lon)
+
+        if lat < lat_min:
+            lat_min = lat
+        if lat > lat_max:
+            lat_max = lat
+        if lon < lon_min:
+            lon_min = lon
+        if lon > lon_max:
+            lon_max = lon
+
+        analyzer.add(elevation)
+
+    if start_point is None:
+        raise ValueError("a course needs at least one point")
+    if len(block_lats) > 1:
+        flush()
+
+    return CourseStats(
+        distances=distances,
+        distance=distance,
+        elevation_gain=analyzer.gain,
+        elevation_loss=analyzer.loss,
+        bounding_box=bounding_box(lat_min, lat_max, lon_min, lon_max),
+        start_point=start_point_dict(*start_point, distance=0.0),
+    )
+
+
+def track_stats(track, threshold=DEFAULT_THRESHOLD, method="geodesic"):
+    """
+    Compute the course statistics of a GeoTrack, vectorized over its columns.
+    """
+    if not len(track):
+        raise ValueError("a course needs at least one point")
+    distances = garmin.geodesy.cumulative_distances(
+        track.latitude, track.longitude, method
+    )
+    gain, loss = elevation_gain_loss(track.elevation, threshold)
+
+    return CourseStats(
+        distances=distances,
+        distance=distances[-1].item(),
+        elevation_gain=gain,
+        elevation_loss=loss,
+        bounding_box=bounding_box(
+            track.latitude.min().item(),
+            track.latitude.max().item(),
+            track.longitude.min().item(),
+            track.longitude.max().item(),
+        ),
+        start_point=start_point_dict(
+            track.latitude[0].item(),
+            track.longitude[0].item(),
+            track.elevation[0].item(),
+            distance=distances[0].item(),
+        ),
+    )
+
+
+def bounding_box(lat_min, lat_max, lon_min, lon_max):
+    return {
+        "lowerLeft": {"latitude": lat_min, "longitude": lon_min},
+        "lowerLeftLatIsSet": True,
+        "lowerLeftLongIsSet": True,
+        "upperRight": {"latitude": lat_max, "longitude": lon_max},
+        "upperRightLatIsSet": True,
+        "upperRightLongIsSet": True,
+    }
+
+
+def start_point_dict(lat, lon, elevation, distance):
+    return {
+        "distance": distance,
+        "elevation": elevation,
+        "latitude": lat,
+        "longitude": lon,
+        "timestamp": None,
+    }
@@ -0,0 +1,103 @@
+"""
+A columnar representation of the points of a course.
+
+Garmin represents a course as a list of geoPoints, one dict per point. For
+long courses that is a lot of memory and every pass over it goes through the
+interpreter, so internally we keep one NumPy array per field instead and only
+build the dicts when the course is sent back to Garmin.
+"""
+
+import numpy as np
+
+
+class GeoTrack(object):
+    """
+    Latitude, longitude, elevation and cumulative distance columns of a track.
+    Missing elevations and distances are stored as NaN.
+    """
+
+    __slots__ = ("latitude", "longitude", "elevation", "distance")
+
+    def __init__(self, latitude, longitude, elevation=None, distance=None):
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.elevation = _column(elevation, len(self.latitude))
+        self.distance = _column(distance, len(self.latitude))
+
+    @classmethod
+    def from_elevation_tuples(cls, r):
+        """
+        Create a track from a response of the elevation endpoint, which is a
+        list of [latitude, longitude, elevation] lists.
+        """
+        columns = np.array(r, dtype=np.float64).reshape(-1, 3)
+        return cls(columns[:, 0], columns[:, 1], columns[:, 2])
+
+    @classmethod
+    def from_geopoints(cls, geopoints):
+        """
+        Create a track from a list of Garmin geoPoint dicts.
+        """
+        return cls(
+            [p["latitude"] for p in geopoints],
+            [p["longitude"] for p in geopoints],
+            [p["elevation"] for p in geopoints],
+            [p["distance"] for p in geopoints],
+        )
+
+    def __len__(self):
+        return len(self.latitude)
+
+    def __getitem__(self, index):
+        """
+        A single point as a Garmin geoPoint dict, or a sub-track for slices and
+        index arrays.
+        """
+        if isinstance(index, (int, np.integer)):
+            return self[index:][:1].to_geopoints()[0]
+        return GeoTrack(
+            self.latitude[index],
+            self.longitude[index],
+            self.elevation[index],
+            self.distance[index],
+        )
+
+    def to_elevation_tuples(self):
+        """
+        Tuples for an elevation data request.
+        """
+        return [[lat, lon, None] for lat, lon in zip(
+            self.latitude.tolist(), self.longitude.tolist()
+        )]
+
+    def to_geopoints(self):
+        """
+        Materialise the track as a list of Garmin geoPoint dicts.
+        """
+        columns = (self.distance, self.elevation, self.latitude, self.longitude)
+        return [
+            {
+                "distance": distance,
+                "elevation": elevation,
+                "latitude": lat,
+                "longitude": lon,
+            }
+            for distance, elevation, lat, lon in zip(*map(_to_list, columns))
+        ]
+
+
+def _column(values, length):
+    if values is None:
+        return np.full(length, np.nan)
+    # None becomes NaN in a float array.
+    return np.asarray(values, dtype=np.float64)
+
+
+def _to_list(column):
+    """
+    Convert a column to Python floats, with None for missing values.
+    """
+    values = column.tolist()
+    if np.isnan(column).any():
+        values = [None if v != v else v for v in values]
+    return values
@@ -0,0 +1,216 @@
+"""
+A persistent queue of jobs, worked off by threads in the background.
+
+Copying a route takes several seconds, which should not hold a web worker. A
+copy is submitted as a job instead, stored in SQLite, and the request returns
+its id right away. Worker threads claim jobs from the database, so jobs
+survive restarts and every process that has a JobQueue on the same database
+helps working them off.
+
+A claimed job is leased to its worker for `lease` seconds, and the lease is
+renewed by a heartbeat while the job runs. When the lease runs out, because
+the process died, the job is claimed again, up to `max_attempts` times. A
+worker only updates a job as long as its claim is the latest one, so a
+worker that lost its lease anyway cannot overwrite the job of the next one.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+import database
+
+log = logging.getLogger(__name__)
+
+
+class JobQueue(object):
+    """Runs `handler(params, progress)` for every submitted job, where params
+    is the dict that was submitted and progress a function that takes the name
+    of the current stage. The handler returns a JSON serializable result.
+    Example of use: ::
+      queue = JobQueue("persist/jobs.sqlite", lambda params, progress: 42)
+      queue.start()
+      job_id = queue.submit({"route_id": 1})
+      queue.get(job_id)["status"]  # "queued", "running", "done" or "failed"
+    """
+
+    def __init__(
+        self, path, handler, workers=2, lease=300, max_attempts=3, poll_interval=1.0
+    ):
+        self.path = path
+        self.handler = handler
+        self.workers = workers
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._threads = []
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        with database.connect(self.path, autocommit=True) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS job ("
+                " id TEXT PRIMARY KEY,"
+                " params TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " stage TEXT,"
+                " result TEXT,"
+                " error TEXT,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " lease_until REAL,"
+                " created_at REAL NOT NULL,"
+                " finished_at REAL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS job_status ON job (status, created_at)"
+            )
+
+    def start(self):
+        """Start the worker threads."""
+        for i in range(self.workers - len(self._threads)):
+            thread = threading.Thread(
+                target=self._work, name="job-worker-%d" % i, daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Let the worker threads finish their current job, and wait for them."""
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._stopping = False
+
+    def submit(self, params):
+        """Queue a job, and return its id."""
+        job_id = uuid.uuid4().hex
+        with database.connect(self.path, autocommit=True) as connection:
+            connection.execute(
+                "INSERT INTO job (id, params, status, created_at)"
+                " VALUES (?, ?, 'queued', ?)",
+                (job_id, json.dumps(params), time.time()),
+            )
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        """The job as a dict, or None if there is no such job."""
+        with database.connect(self.path, autocommit=True) as connection:
+            row = connection.execute(
+                "SELECT * FROM job WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for field in ("params", "result"):
+            if job[field] is not None:
+                job[field] = json.loads(job[field])
+        return job
+
+    def _work(self):
+        while True:
+            with self._wakeup:
+                if self._stopping:
+                    return
+            try:
+                job = self._claim()
+            except sqlite3.Error:
+                log.exception("claiming a job failed")
+                job = None
+            if job is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(self.poll_interval)
+                continue
+            self._run(job)
+
+    def _claim(self):
+        """Take the oldest job that is queued or whose lease ran out."""
+        now = time.time()
+        with database.connect(self.path, autocommit=True) as connection:
+            # Take the write lock right away, so that no other worker claims
+            # the same job.
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = connection.execute(
+                        "SELECT id, params, attempts FROM job"
+                        " WHERE status = 'queued'"
+                        " OR (status = 'running' AND lease_until < ?)"
+                        " ORDER BY created_at LIMIT 1",
+                        (now,),
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    if row["attempts"] < self.max_attempts:
+                        break
+                    # Every attempt died with its worker.
+                    connection.execute(
+                        "UPDATE job SET status = 'failed', finished_at = ?,"
+                        " error = 'worker stopped' WHERE id = ?",
+                        (now, row["id"]),
+                    )
+                connection.execute(
+                    "UPDATE job SET status = 'running', stage = NULL,"
+                    " attempts = attempts + 1, lease_until = ? WHERE id = ?",
+                    (now + self.lease, row["id"]),
+                )
+            finally:
+                connection.execute("COMMIT")
+        return row["id"], json.loads(row["params"]), row["attempts"] + 1
+
+    def _run(self, job):
+        job_id, params, attempt = job
+        finished = threading.Event()
+
+        def heartbeat():
+            while not finished.wait(self.lease / 3):
+                try:
+                    renewed = self._update(
+                        job_id, attempt, lease_until=time.time() + self.lease
+                    )
+                except sqlite3.Error:
+                    log.exception("renewing the lease of job %s failed", job_id)
+                    continue
+                if not renewed:
+                    log.warning("job %s was claimed by another worker", job_id)
+                    return
+
+        def progress(stage):
+            self._update(job_id, attempt, stage=stage)
+
+        log.info("running job %s", job_id)
+        threading.Thread(
+            target=heartbeat, name="job-heartbeat-%s" % job_id, daemon=True
+        ).start()
+        try:
+            result = self.handler(params, progress)
+        except Exception as e:
+            log.exception("job %s failed", job_id)
+            fields = dict(status="failed", error=str(e))
+        else:
+            fields = dict(status="done", result=json.dumps(result))
+        finally:
+            finished.set()
+        if not self._update(job_id, attempt, finished_at=time.time(), **fields):
+            log.warning(
+                "job %s was claimed by another worker, dropping its result", job_id
+            )
+
+    def _update(self, job_id, attempt, **fields):
+        """Update the job if it is still running under this claim, and return
+        whether it was."""
+        assignments = ", ".join("%s = ?" % name for name in fields)
+        with database.connect(self.path, autocommit=True) as connection:
+            cursor = connection.execute(
+                "UPDATE job SET %s WHERE id = ? AND attempts = ?"
+                " AND status = 'running'" % assignments,
+                list(fields.values()) + [job_id, attempt],
+            )
+        return cursor.rowcount > 0
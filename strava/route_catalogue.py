@@ -0,0 +1,225 @@
+"""
+A cached listing of the routes of an athlete.
+
+Listing the routes takes a request per 200 routes (which are made
+concurrently), plus possibly a token refresh, which is too slow to do on every
+page load. The catalogue serves the last listing immediately, and refreshes it
+in the background once it is older than the ttl. Refreshes are incremental:
+pages are fetched until a full page has no new or changed routes (by their
+`timestamp`), and the rest is taken from the previous listing. Routes that
+changed further down the listing, and deleted routes, are picked up by a full
+refresh every `full_refresh_ttl`.
+
+With a path, the listing is also kept in SQLite, so that it survives restarts
+and is shared by all processes.
+"""
+
+import json
+import logging
+import threading
+import time
+
+import database
+import strava.tokens
+import swagger_client
+from swagger_client import deserializer, pagination
+
+log = logging.getLogger(__name__)
+
+
+class RouteCatalogue(object):
+    """The routes of one athlete, as lazy Route models.
+    Example of use: ::
+      catalogue = RouteCatalogue(athlete_id, path="persist/routes.sqlite")
+      routes = catalogue.routes()
+    """
+
+    def __init__(
+        self, athlete_id, ttl=300, full_refresh_ttl=24 * 3600, path=None, per_page=200
+    ):
+        self.athlete_id = athlete_id
+        self.ttl = ttl
+        self.full_refresh_ttl = full_refresh_ttl
+        self.path = path
+        self.per_page = per_page
+        # The raw JSON of the routes in the order of the listing, and when the
+        # listing was last refreshed and fully refreshed.
+        self._raw = None
+        self._routes = None
+        self._refreshed_at = 0
+        self._full_refreshed_at = 0
+        self._lock = threading.Lock()
+        # Held during a refresh, so that there is only one at a time.
+        self._refresh_lock = threading.Lock()
+        if path:
+            self._create_tables()
+
+    def routes(self):
+        """
+        The routes, from the cache if there is one. A stale cache is refreshed
+        in the background, an empty one right away.
+        """
+        with self._lock:
+            if self._raw is None:
+                self._load()
+            routes, refreshed_at = self._routes, self._refreshed_at
+
+        if routes is None:
+            self.refresh()
+            return self._routes
+        if time.time() - refreshed_at > self.ttl:
+            self._refresh_in_background()
+        return routes
+
+    def iter_routes(self):
+        """
+        Like routes, but without a cache the routes are generated as the pages
+        come in, instead of after the whole listing has been fetched.
+        """
+        with self._lock:
+            if self._raw is None:
+                self._load()
+            routes, refreshed_at = self._routes, self._refreshed_at
+
+        if routes is None:
+            return self._iter_refresh()
+        if time.time() - refreshed_at > self.ttl:
+            self._refresh_in_background()
+        return iter(routes)
+
+    def refresh(self, full=False):
+        """Refresh the listing now. If another refresh is in progress, wait for
+        that one instead, unless a full refresh is asked for."""
+        with self._refresh_lock:
+            for _ in self._refresh_pages(full):
+                pass
+
+    def _iter_refresh(self):
+        with self._refresh_lock:
+            if self._routes is not None:
+                # Refreshed while we were waiting.
+                for route in self._routes:
+                    yield route
+                return
+            for page in self._refresh_pages(full=True):
+                for route in deserializer.deserialize(page, "list[Route]", lazy=True):
+                    yield route
+
+    def _refresh_in_background(self):
+        if self._refresh_lock.locked():
+            return
+
+        def refresh():
+            try:
+                self.refresh()
+            except Exception:
+                log.exception("refreshing the routes failed")
+
+        threading.Thread(target=refresh, name="route-catalogue", daemon=True).start()
+
+    def _refresh_pages(self, full):
+        """Refresh the listing, and generate the raw routes of every page that
+        is fetched."""
+        now = time.time()
+        with self._lock:
+            # Another process may have refreshed the listing already.
+            self._load()
+            if (
+                not full
+                and self._raw is not None
+                and now - self._refreshed_at <= self.ttl
+            ):
+                return
+            known = {r["id"]: r.get("timestamp") for r in self._raw or []}
+            previous = self._raw or []
+            full_refreshed_at = self._full_refreshed_at
+        full = full or not known or now - full_refreshed_at > self.full_refresh_ttl
+
+        strava_client = swagger_client.ApiClient()
+        strava_client.configuration.access_token = strava.tokens.request_access_token()
+        routes_api = swagger_client.RoutesApi(api_client=strava_client)
+
+        fetched = []
+        complete = False
+        pages = pagination.iter_pages(
+            routes_api.get_routes_by_athlete_id,
+            self.athlete_id,
+            per_page=self.per_page,
+            # An incremental refresh usually only needs the first page.
+            prefetch=2 if full else 0,
+            _preload_content=False,
+        )
+        try:
+            for page, routes in enumerate(pages, 1):
+                fetched.extend(routes)
+                yield routes
+                if len(routes) < self.per_page:
+                    complete = True
+                    break
+                unchanged = all(
+                    known.get(r["id"]) == r.get("timestamp") for r in routes
+                )
+                if unchanged and not full:
+                    break
+        finally:
+            pages.close()
+
+        raw = fetched
+        if not complete:
+            seen = set(r["id"] for r in fetched)
+            raw = fetched + [r for r in previous if r["id"] not in seen]
+        log.info(
+            "refreshed %d routes (%s) with %d pages",
+            len(raw),
+            "full" if complete else "incremental",
+            page,
+        )
+
+        with self._lock:
+            self._set(raw, now, now if complete else full_refreshed_at)
+            self._save()
+
+    def _set(self, raw, refreshed_at, full_refreshed_at):
+        self._raw = raw
+        self._routes = deserializer.deserialize(raw, "list[Route]", lazy=True)
+        self._refreshed_at = refreshed_at
+        self._full_refreshed_at = full_refreshed_at
+
+    def _create_tables(self):
+        with database.connect(self.path) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS listing ("
+                " athlete_id INTEGER PRIMARY KEY,"
+                " refreshed_at REAL NOT NULL,"
+                " full_refreshed_at REAL NOT NULL,"
+                " routes TEXT NOT NULL)"
+            )
+
+    def _load(self):
+        """Take the listing from the database, if it is newer."""
+        if not self.path:
+            return
+        with database.connect(self.path) as connection:
+            row = connection.execute(
+                "SELECT refreshed_at, full_refreshed_at, routes FROM listing"
+                " WHERE athlete_id = ?",
+                (self.athlete_id,),
+            ).fetchone()
+        if row is None or (self._raw is not None and row[0] <= self._refreshed_at):
+            return
+        refreshed_at, full_refreshed_at, routes = row
+        self._set(json.loads(routes), refreshed_at, full_refreshed_at)
+
+    def _save(self):
+        if not self.path:
+            return
+        with database.connect(self.path) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO listing VALUES (?, ?, ?, ?)",
+                (
+                    self.athlete_id,
+                    self._refreshed_at,
+                    self._full_refreshed_at,
+                    json.dumps(self._raw),
+                ),
+            )
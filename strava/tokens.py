@@ -1,37 +1,115 @@
+import contextlib
+import fcntl
+import json
 import re
+import threading
+import time
 import requests
 import config
+from atomic_write import write_atomically
+
+REFRESH_TOKEN_PATH = "persist/strava_refresh_token"
+ACCESS_TOKEN_PATH = "persist/strava_access_token"
+LOCK_PATH = "persist/strava_tokens.lock"
+
+# Refresh access tokens that expire within this many seconds.
+EXPIRY_MARGIN = 300
+
+# In-process copy of the persisted access token, so that the common case needs
+# no disk access at all.
+_access_token = None
+
+# Strava may rotate the refresh token on every refresh, so only one refresh can
+# be in flight at a time. Threads in this process wait on the lock, other
+# processes (gunicorn workers) on the lock file.
+_refresh_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def locked():
+    """
+    Hold the lock on the persisted tokens, across threads and processes.
+    """
+    with _refresh_lock, open(LOCK_PATH, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 
 def get_persisted_refresh_token() -> str:
-    with open("persist/strava_refresh_token") as f:
+    with open(REFRESH_TOKEN_PATH) as f:
         return f.read().strip()
 
 
 def persist_refresh_token(refresh_token: str) -> None:
     if re.match("^[a-f0-9]+$", refresh_token) is None:
         raise ValueError("refresh_token should contain only 0-9 and a-f")
-    with open("persist/strava_refresh_token", "w") as f:
-        f.write(refresh_token)
+    write_atomically(REFRESH_TOKEN_PATH, refresh_token)
+
+
+def get_persisted_access_token() -> dict:
+    """
+    Returns the persisted access token as a dict with access_token and
+    expires_at, or None if there is none.
+    """
+    try:
+        with open(ACCESS_TOKEN_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def persist_access_token(access_token: dict) -> None:
+    write_atomically(ACCESS_TOKEN_PATH, json.dumps(access_token))
+
+
+def is_valid(access_token: dict) -> bool:
+    return (
+        access_token is not None
+        and access_token["expires_at"] - EXPIRY_MARGIN > time.time()
+    )
 
 
 def request_access_token() -> str:
     """
-    This one is a bit inefficient because it always refreshes the access
-    token. We should actually store the access_token as well and only refresh if
-    it is expired.
+    Returns an access token. It is reused until shortly before it expires,
+    first from memory and then from persist/strava_access_token. Only then is
+    it refreshed with Strava.
     """
+    global _access_token
+
+    access_token = _access_token
+    if is_valid(access_token):
+        return access_token["access_token"]
+
+    with locked():
+        # Another thread or process may have refreshed the token while we were
+        # waiting for the lock.
+        access_token = get_persisted_access_token()
+        if not is_valid(access_token):
+            access_token = refresh_access_token()
+        _access_token = access_token
+    return access_token["access_token"]
 
+
+def refresh_access_token() -> dict:
+    """
+    Get a new access token from Strava, and persist it together with the
+    refresh token. Call this while holding the lock.
+    """
+    refresh_token = get_persisted_refresh_token()
     params = {
         "client_id": config.strava_client_id,
         "client_secret": config.strava_client_secret,
         "grant_type": "refresh_token",
-        "refresh_token": get_persisted_refresh_token(),
+        "refresh_token": refresh_token,
     }
 
     # The request may change the refresh token, so first check that we'll be
     # able to persist it.
-    persist_refresh_token(params["refresh_token"])
+    persist_refresh_token(refresh_token)
 
     response = requests.post("https://www.strava.com/oauth/token", params)
     json = response.json()
@@ -44,8 +122,14 @@ def request_access_token() -> str:
     #    'expires_in': 19837,
     #    'refresh_token': 'abcdef01234567890'
     # }
-    persist_refresh_token(json["refresh_token"])
-    return json["access_token"]
+    if json["refresh_token"] != refresh_token:
+        persist_refresh_token(json["refresh_token"])
+    access_token = {
+        "access_token": json["access_token"],
+        "expires_at": json["expires_at"],
+    }
+    persist_access_token(access_token)
+    return access_token
 
 
 def authorize_with_code(code: str) -> str:
@@ -64,8 +148,16 @@ def authorize_with_code(code: str) -> str:
         "code": code,
     }
 
+    global _access_token
+
     response = requests.post("https://www.strava.com/oauth/token", params)
     json = response.json()
 
-    persist_refresh_token(json["refresh_token"])
+    with locked():
+        persist_refresh_token(json["refresh_token"])
+        _access_token = {
+            "access_token": json["access_token"],
+            "expires_at": json["expires_at"],
+        }
+        persist_access_token(_access_token)
     return json
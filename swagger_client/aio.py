@@ -0,0 +1,322 @@
+# coding: utf-8
+
+"""
+    Strava API v3
+
+    Asyncio support for the generated API classes.
+
+    With an AsyncApiClient, every method of the generated *Api classes returns
+    a coroutine instead of doing a blocking request, so many requests can be in
+    flight without a thread per request:
+
+        async with AsyncApiClient() as api_client:
+            routes_api = swagger_client.RoutesApi(api_client)
+            routes = await asyncio.gather(
+                *(routes_api.get_route_by_id(id) for id in route_ids))
+
+    The HTTP requests are made by a transport; aiohttp and httpx are supported,
+    and whichever is installed is used by default.
+"""
+
+from __future__ import absolute_import
+
+import asyncio
+import json
+import logging
+import re
+import ssl
+
+import certifi
+from six.moves.urllib.parse import urlencode
+
+from swagger_client.api_client import ApiClient
+from swagger_client.rest import ApiException
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRESTResponse(object):
+    """The counterpart of rest.RESTResponse for async transports. The body
+    is always read completely."""
+
+    def __init__(self, status, reason, data, headers):
+        self.status = status
+        self.reason = reason
+        self.data = data
+        self.headers = headers
+
+    def getheaders(self):
+        """Returns a dictionary of the response headers."""
+        return self.headers
+
+    def getheader(self, name, default=None):
+        """Returns a given response header."""
+        return self.headers.get(name, default)
+
+
+class AsyncTransport(object):
+    """Base class of the async HTTP transports.
+
+    :param configuration: .Configuration object, for the SSL, proxy and
+        connection pool settings.
+    """
+
+    def __init__(self, configuration):
+        self.configuration = configuration
+
+    def ssl_context(self):
+        context = ssl.create_default_context(
+            cafile=self.configuration.ssl_ca_cert or certifi.where())
+        if self.configuration.cert_file:
+            context.load_cert_chain(self.configuration.cert_file,
+                                    self.configuration.key_file)
+        if not self.configuration.verify_ssl:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        return context
+
+    async def request(self, method, url, query_params=None, headers=None,
+                      body=None, post_params=None, _preload_content=True,
+                      _request_timeout=None):
+        """Perform a request, with the same parameters as
+        rest.RESTClientObject.request.
+
+        If _preload_content is False the body is not decoded, but it is
+        still read completely.
+        """
+        method = method.upper()
+        if post_params and body:
+            raise ValueError(
+                "body parameter cannot be used with post_params parameter."
+            )
+        post_params = post_params or []
+        headers = dict(headers or {})
+        if 'Content-Type' not in headers:
+            headers['Content-Type'] = 'application/json'
+        if query_params:
+            url += '?' + urlencode(query_params)
+
+        kwargs = {}
+        if method in ['POST', 'PUT', 'PATCH', 'OPTIONS', 'DELETE']:
+            content_type = headers['Content-Type']
+            if re.search('json', content_type, re.IGNORECASE):
+                if body is not None:
+                    kwargs['content'] = json.dumps(body)
+            elif content_type == 'application/x-www-form-urlencoded':
+                kwargs['content'] = urlencode(post_params)
+            elif content_type == 'multipart/form-data':
+                # The transport sets the content type with the boundary.
+                del headers['Content-Type']
+                kwargs['fields'] = post_params
+            elif isinstance(body, str):
+                kwargs['content'] = body
+            else:
+                raise ApiException(
+                    status=0,
+                    reason="Cannot prepare a request message for provided "
+                           "arguments. Please check that your arguments "
+                           "match declared content type.")
+
+        r = await self._send(method, url, headers, _timeout(_request_timeout),
+                             **kwargs)
+
+        if _preload_content:
+            r.data = r.data.decode('utf8')
+            logger.debug("response body: %s", r.data)
+
+        if not 200 <= r.status <= 299:
+            raise ApiException(http_resp=r)
+        return r
+
+    async def _send(self, method, url, headers, timeout, content=None,
+                    fields=None):
+        """Send the request and read the response into an
+        AsyncRESTResponse. The body is either `content` or the multipart
+        form `fields`, a list of (name, value) tuples where the value may
+        be a (filename, data, mimetype) tuple."""
+        raise NotImplementedError()
+
+    async def close(self):
+        pass
+
+
+class AiohttpTransport(AsyncTransport):
+
+    def __init__(self, configuration):
+        if aiohttp is None:
+            raise ImportError('AiohttpTransport requires aiohttp.')
+        super(AiohttpTransport, self).__init__(configuration)
+        self._session = None
+
+    @property
+    def session(self):
+        # The session must be created inside the event loop.
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.configuration.connection_pool_maxsize,
+                ssl=self.ssl_context())
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def _send(self, method, url, headers, timeout, content=None,
+                    fields=None):
+        data = content
+        if fields is not None:
+            data = aiohttp.FormData()
+            for name, value in fields:
+                if isinstance(value, tuple):
+                    filename, filedata, mimetype = value
+                    data.add_field(name, filedata, filename=filename,
+                                   content_type=mimetype)
+                else:
+                    data.add_field(name, str(value))
+        if timeout is not None:
+            timeout = aiohttp.ClientTimeout(total=timeout[0],
+                                            sock_connect=timeout[1],
+                                            sock_read=timeout[2])
+        async with self.session.request(method, url, headers=headers,
+                                        data=data, timeout=timeout,
+                                        proxy=self.configuration.proxy) as r:
+            return AsyncRESTResponse(r.status, r.reason, await r.read(),
+                                     r.headers)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class HttpxTransport(AsyncTransport):
+
+    def __init__(self, configuration):
+        if httpx is None:
+            raise ImportError('HttpxTransport requires httpx.')
+        super(HttpxTransport, self).__init__(configuration)
+        self._client = httpx.AsyncClient(
+            verify=self.ssl_context(),
+            proxy=configuration.proxy,
+            limits=httpx.Limits(
+                max_connections=configuration.connection_pool_maxsize))
+
+    async def _send(self, method, url, headers, timeout, content=None,
+                    fields=None):
+        kwargs = {}
+        if fields is not None:
+            kwargs['data'] = {name: value for name, value in fields
+                              if not isinstance(value, tuple)}
+            kwargs['files'] = [(name, value) for name, value in fields
+                               if isinstance(value, tuple)]
+        elif content is not None:
+            kwargs['content'] = content
+        if timeout is not None:
+            kwargs['timeout'] = httpx.Timeout(timeout[0], connect=timeout[1],
+                                              read=timeout[2])
+        r = await self._client.request(method, url, headers=headers,
+                                       **kwargs)
+        return AsyncRESTResponse(r.status_code, r.reason_phrase, r.content,
+                                 r.headers)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def _timeout(_request_timeout):
+    """Convert a request timeout to a (total, connect, read) tuple."""
+    if not _request_timeout:
+        return None
+    if isinstance(_request_timeout, (int, float)):
+        return (_request_timeout, None, None)
+    connect, read = _request_timeout
+    return (None, connect, read)
+
+
+def default_transport(configuration):
+    """The transport of whichever supported library is installed."""
+    if aiohttp is not None:
+        return AiohttpTransport(configuration)
+    if httpx is not None:
+        return HttpxTransport(configuration)
+    raise ImportError('AsyncApiClient requires aiohttp or httpx.')
+
+
+class AsyncApiClient(ApiClient):
+    """An ApiClient whose call_api is a coroutine.
+
+    :param configuration: .Configuration object for this client
+    :param transport: AsyncTransport to make the requests with, by default
+        an AiohttpTransport or HttpxTransport.
+    """
+
+    def __init__(self, configuration=None, transport=None, header_name=None,
+                 header_value=None, cookie=None):
+        super(AsyncApiClient, self).__init__(configuration, header_name,
+                                             header_value, cookie)
+        if transport is None:
+            transport = default_transport(self.configuration)
+        self.transport = transport
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        await self.transport.close()
+
+    async def call_api(self, resource_path, method,
+                       path_params=None, query_params=None,
+                       header_params=None, body=None, post_params=None,
+                       files=None, response_type=None, auth_settings=None,
+                       async_req=None, _return_http_data_only=None,
+                       collection_formats=None, _preload_content=True,
+                       _request_timeout=None):
+        """Makes the HTTP request and returns deserialized data, see
+        ApiClient.call_api. async_req is ignored."""
+        method, url, request_params = self._prepare_request(
+            resource_path, method, path_params, query_params, header_params,
+            body, post_params, files, auth_settings, collection_formats)
+
+        response_data = await self._rate_limited_request(
+            method, url, _preload_content=_preload_content,
+            _request_timeout=_request_timeout, **request_params)
+
+        return self._process_response(response_data, response_type,
+                                      _return_http_data_only,
+                                      _preload_content)
+
+    async def _rate_limited_request(self, method, url, **kwargs):
+        rate_limiter = self.configuration.rate_limiter
+        if rate_limiter is None:
+            return await self.transport.request(method, url, **kwargs)
+
+        retries = self.configuration.rate_limit_retries
+        while True:
+            wait = rate_limiter.try_acquire()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                response_data = await self.transport.request(method, url,
+                                                             **kwargs)
+            except ApiException as e:
+                rate_limiter.update(e.headers)
+                if e.status != 429 or retries <= 0:
+                    raise
+                retries -= 1
+                if not e.headers:
+                    rate_limiter.exhausted()
+                continue
+            rate_limiter.update(response_data.getheaders())
+            return response_data
@@ -18,6 +18,7 @@ import re  # noqa: F401
 # python 2 and python 3 compatibility library
 import six
 
+from swagger_client import rest
 from swagger_client.api_client import ApiClient
 
 
@@ -128,6 +129,26 @@ class RoutesApi(object):
             _request_timeout=params.get('_request_timeout'),
             collection_formats=collection_formats)
 
+    def stream_route_as_gpx(self, id, chunk_size=64 * 1024, **kwargs):  # noqa: E501
+        """Export Route GPX as a stream  # noqa: E501
+
+        Like get_route_as_gpx, but returns the GPX file as an iterator of
+        bytes chunks, which are read from the connection as they are consumed.
+        Only synchronous requests are supported.
+        >>> for chunk in api.stream_route_as_gpx(id):
+        ...     f.write(chunk)
+
+        :param int id: The identifier of the route. (required)
+        :param int chunk_size: Maximum size of a chunk, in bytes.
+        :return: iterator of bytes
+        """
+        if kwargs.get('async_req'):
+            raise ValueError("async_req is not supported when streaming")
+        kwargs['_return_http_data_only'] = True
+        kwargs['_preload_content'] = False
+        response = self.get_route_as_gpx_with_http_info(id, **kwargs)  # noqa: E501
+        return rest.iter_content(response, chunk_size)
+
     def get_route_as_tcx(self, id, **kwargs):  # noqa: E501
         """Export Route TCX  # noqa: E501
 
@@ -223,6 +244,26 @@ class RoutesApi(object):
             _request_timeout=params.get('_request_timeout'),
             collection_formats=collection_formats)
 
+    def stream_route_as_tcx(self, id, chunk_size=64 * 1024, **kwargs):  # noqa: E501
+        """Export Route TCX as a stream  # noqa: E501
+
+        Like get_route_as_tcx, but returns the TCX file as an iterator of
+        bytes chunks, which are read from the connection as they are consumed.
+        Only synchronous requests are supported.
+        >>> for chunk in api.stream_route_as_tcx(id):
+        ...     f.write(chunk)
+
+        :param int id: The identifier of the route. (required)
+        :param int chunk_size: Maximum size of a chunk, in bytes.
+        :return: iterator of bytes
+        """
+        if kwargs.get('async_req'):
+            raise ValueError("async_req is not supported when streaming")
+        kwargs['_return_http_data_only'] = True
+        kwargs['_preload_content'] = False
+        response = self.get_route_as_tcx_with_http_info(id, **kwargs)  # noqa: E501
+        return rest.iter_content(response, chunk_size)
+
     def get_route_by_id(self, id, **kwargs):  # noqa: E501
         """Get Route  # noqa: E501
 
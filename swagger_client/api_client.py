@@ -25,6 +25,7 @@ from six.moves.urllib.parse import quote
 
 from swagger_client.configuration import Configuration
 import swagger_client.models
+from swagger_client import deserializer
 from swagger_client import rest
 
 
@@ -106,6 +107,28 @@ class ApiClient(object):
             _return_http_data_only=None, collection_formats=None,
             _preload_content=True, _request_timeout=None):
 
+        method, url, request_params = self._prepare_request(
+            resource_path, method, path_params, query_params, header_params,
+            body, post_params, files, auth_settings, collection_formats)
+
+        # perform request and return response
+        response_data = self.__rate_limited_request(
+            method, url, _preload_content=_preload_content,
+            _request_timeout=_request_timeout, **request_params)
+
+        return self._process_response(response_data, response_type,
+                                      _return_http_data_only,
+                                      _preload_content)
+
+    def _prepare_request(
+            self, resource_path, method, path_params=None,
+            query_params=None, header_params=None, body=None, post_params=None,
+            files=None, auth_settings=None, collection_formats=None):
+        """Builds the url and parameters of a request.
+
+        :return: Tuple of method, url and a dict with the query_params,
+            headers, post_params and body of the request.
+        """
         config = self.configuration
 
         # header parameters
@@ -153,13 +176,14 @@ class ApiClient(object):
         # request url
         url = self.configuration.host + resource_path
 
-        # perform request and return response
-        response_data = self.request(
-            method, url, query_params=query_params, headers=header_params,
-            post_params=post_params, body=body,
-            _preload_content=_preload_content,
-            _request_timeout=_request_timeout)
+        return method, url, {'query_params': query_params,
+                             'headers': header_params,
+                             'post_params': post_params,
+                             'body': body}
 
+    def _process_response(self, response_data, response_type,
+                          _return_http_data_only, _preload_content):
+        """Deserializes the response of a request."""
         self.last_response = response_data
 
         return_data = response_data
@@ -176,6 +200,33 @@ class ApiClient(object):
             return (return_data, response_data.status,
                     response_data.getheaders())
 
+    def __rate_limited_request(self, method, url, **kwargs):
+        """Makes the request when the rate limiter allows it, and retries
+        requests that were rate limited anyway."""
+        rate_limiter = self.configuration.rate_limiter
+        if rate_limiter is None:
+            return self.request(method, url, **kwargs)
+
+        retries = self.configuration.rate_limit_retries
+        while True:
+            rate_limiter.acquire()
+            try:
+                response_data = self.request(method, url, **kwargs)
+            except rest.ApiException as e:
+                rate_limiter.update(e.headers)
+                if e.status != 429 or retries <= 0:
+                    raise
+                retries -= 1
+                if not e.headers:
+                    rate_limiter.exhausted()
+                continue
+            # The raw urllib3 response when the content is not preloaded.
+            headers = getattr(response_data, 'headers', None)
+            if headers is None:
+                headers = response_data.getheaders()
+            rate_limiter.update(headers)
+            return response_data
+
     def sanitize_for_serialization(self, obj):
         """Builds a JSON POST object.
 
@@ -248,6 +299,10 @@ class ApiClient(object):
 
         :return: object.
         """
+        if self.configuration.compiled_deserializer:
+            return deserializer.deserialize(data, klass,
+                                            self.configuration.lazy_models)
+
         if data is None:
             return None
 
@@ -22,6 +22,8 @@ import urllib3
 import six
 from six.moves import http_client as httplib
 
+from swagger_client import rate_limit
+
 
 class Configuration(object):
     """NOTE: This class is auto generated by the swagger code generator program.
@@ -97,6 +99,20 @@ class Configuration(object):
         # Safe chars for path_param
         self.safe_chars_for_path_param = ''
 
+        # Scheduler that paces requests to the rate limits of the API. It is
+        # shared by all clients, because the limits apply to the application.
+        # Set to None to disable.
+        self.rate_limiter = rate_limit.default_rate_limiter
+        # How often to retry a request that got a 429 response anyway.
+        self.rate_limit_retries = 2
+
+        # Deserialize responses with the compiled deserializers of
+        # swagger_client.deserializer instead of the generic code.
+        self.compiled_deserializer = True
+        # Create models that deserialize their attributes on first access.
+        # Only used with the compiled deserializer.
+        self.lazy_models = False
+
     @classmethod
     def set_default(cls, default):
         cls._default = default
@@ -0,0 +1,292 @@
+# coding: utf-8
+
+"""
+    Strava API v3
+
+    Compiled deserialization of API responses into models.
+
+    ApiClient.__deserialize interprets type strings like `list[SummarySegment]`
+    and goes through the validating property setters for every object it
+    creates. Here every type string is turned into a deserializer function
+    once, and models are filled in directly. The results are the same as those
+    of the generic path, except that enum values are not validated.
+
+    In lazy mode, models keep the parsed JSON and only deserialize an
+    attribute when it is first accessed.
+"""
+
+from __future__ import absolute_import
+
+import datetime
+import functools
+import re
+import threading
+
+import six
+
+import swagger_client.models
+from swagger_client import rest
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+_NATIVE_TYPES = {
+    'int': int,
+    'long': int if six.PY3 else long,  # noqa: F821
+    'float': float,
+    'str': str,
+    'bool': bool,
+    'date': datetime.date,
+    'datetime': datetime.datetime,
+    'object': object,
+}
+_PRIMITIVE_TYPES = (float, bool, bytes, six.text_type) + six.integer_types
+
+
+def deserializer(klass, lazy=False):
+    """Returns a function that deserializes data of the given type.
+
+    :param klass: class literal, or string of class name.
+    :param lazy: Whether to create lazy models.
+    """
+    key = (klass, lazy)
+    try:
+        return _cache[key]
+    except KeyError:
+        pass
+    with _cache_lock:
+        if key not in _cache:
+            _cache[key] = _compile(klass, lazy)
+        return _cache[key]
+
+
+def deserialize(data, klass, lazy=False):
+    """Deserializes dict, list, str into an object of the given type."""
+    return deserializer(klass, lazy)(data)
+
+
+def _compile(klass, lazy):
+    if type(klass) == str:
+        if klass.startswith('list['):
+            sub_kls = re.match(r'list\[(.*)\]', klass).group(1)
+            return _list_deserializer(sub_kls, lazy)
+
+        if klass.startswith('dict('):
+            sub_kls = re.match(r'dict\(([^,]*), (.*)\)', klass).group(2)
+            return _dict_deserializer(sub_kls, lazy)
+
+        # convert str to class
+        if klass in _NATIVE_TYPES:
+            klass = _NATIVE_TYPES[klass]
+        else:
+            klass = getattr(swagger_client.models, klass)
+
+    if klass in _PRIMITIVE_TYPES:
+        return _primitive_deserializer(klass)
+    elif klass == object:
+        return _none_or(lambda data: data)
+    elif klass == datetime.date:
+        return _none_or(_deserialize_date)
+    elif klass == datetime.datetime:
+        return _none_or(_deserialize_datetime)
+    elif lazy and klass.swagger_types:
+        return _lazy_model_deserializer(klass)
+    else:
+        return _model_deserializer(klass)
+
+
+def _none_or(func):
+    def deserialize(data):
+        if data is None:
+            return None
+        return func(data)
+    return deserialize
+
+
+def _list_deserializer(sub_kls, lazy):
+    def deserialize(data):
+        if data is None:
+            return None
+        sub = deserializer(sub_kls, lazy)
+        return [sub(sub_data) for sub_data in data]
+    return deserialize
+
+
+def _dict_deserializer(sub_kls, lazy):
+    def deserialize(data):
+        if data is None:
+            return None
+        sub = deserializer(sub_kls, lazy)
+        return {k: sub(v) for k, v in six.iteritems(data)}
+    return deserialize
+
+
+def _primitive_deserializer(klass):
+    def deserialize(data):
+        if data is None:
+            return None
+        try:
+            return klass(data)
+        except UnicodeEncodeError:
+            return six.text_type(data)
+        except TypeError:
+            return data
+    return deserialize
+
+
+def _deserialize_date(string):
+    try:
+        from dateutil.parser import parse
+        return parse(string).date()
+    except ImportError:
+        return string
+    except ValueError:
+        raise rest.ApiException(
+            status=0,
+            reason="Failed to parse `{0}` as date object".format(string)
+        )
+
+
+# The format the Strava API uses, e.g. 2013-07-30T21:12:09Z
+_ISO_DATETIME = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?'
+    r'(Z|[+-]\d\d:?\d\d)?$')
+
+
+@functools.lru_cache(maxsize=4096)
+def _deserialize_datetime(string):
+    """Parses ISO 8601 datetimes directly, and falls back to dateutil for
+    anything else. dateutil is slow and dominates deserialization time
+    otherwise. Timestamps repeat a lot (e.g. the athlete of every route), so
+    results are cached; datetimes are immutable."""
+    try:
+        from dateutil.parser import parse
+        from dateutil.tz import tzoffset, tzutc
+    except ImportError:
+        return string
+
+    match = _ISO_DATETIME.match(string)
+    if match:
+        year, month, day, hour, minute, second, fraction, tz = match.groups()
+        if tz is None:
+            tzinfo = None
+        elif tz == 'Z':
+            tzinfo = tzutc()
+        else:
+            sign = -1 if tz[0] == '-' else 1
+            offset = sign * (int(tz[1:3]) * 3600 + int(tz[-2:]) * 60)
+            tzinfo = tzoffset(None, offset)
+        microsecond = int(fraction.ljust(6, '0')) if fraction else 0
+        try:
+            return datetime.datetime(
+                int(year), int(month), int(day), int(hour), int(minute),
+                int(second), microsecond, tzinfo)
+        except ValueError:
+            pass
+
+    try:
+        return parse(string)
+    except ValueError:
+        raise rest.ApiException(
+            status=0,
+            reason=(
+                "Failed to parse `{0}` as datetime object".format(string)
+            )
+        )
+
+
+def _model_deserializer(klass):
+    if not klass.swagger_types:
+        # Models without attributes, like LatLng, stay plain data.
+        return _none_or(lambda data: data)
+
+    # The generated constructors set every attribute to None in a private
+    # `_attribute`, then call the setters. We start from a copy of that
+    # initial state and set the private attributes directly.
+    initial = vars(klass()).copy()
+    # The fields are compiled on first use, because models can refer to each
+    # other.
+    fields = []
+
+    def deserialize(data):
+        if data is None:
+            return None
+        if not fields:
+            fields[:] = [
+                (klass.attribute_map[attr], '_' + attr, deserializer(attr_type))
+                for attr, attr_type in six.iteritems(klass.swagger_types)]
+        instance = klass.__new__(klass)
+        state = instance.__dict__
+        state.update(initial)
+        if isinstance(data, dict):
+            for key, private_attr, sub in fields:
+                if key in data:
+                    state[private_attr] = sub(data[key])
+        return instance
+    return deserialize
+
+
+def _lazy_model_deserializer(klass):
+    lazy_klass = _lazy_class(klass)
+
+    def deserialize(data):
+        if data is None:
+            return None
+        instance = lazy_klass.__new__(lazy_klass)
+        instance.discriminator = None
+        instance._raw = data if isinstance(data, dict) else {}
+        return instance
+    return deserialize
+
+
+def _lazy_class(klass):
+    """A subclass of the model whose attributes are deserialized from the raw
+    data on first access, and then stored like in the model itself."""
+
+    def lazy_property(attr, attr_type):
+        key = klass.attribute_map[attr]
+        private_attr = '_' + attr
+        model_property = getattr(klass, attr)
+
+        def getter(self):
+            state = self.__dict__
+            try:
+                return state[private_attr]
+            except KeyError:
+                value = None
+                if key in self._raw:
+                    value = deserializer(attr_type, True)(self._raw[key])
+                state[private_attr] = value
+                return value
+        return property(getter, model_property.fset, None,
+                        model_property.__doc__)
+
+    def materialize(self):
+        """Deserialize all remaining attributes."""
+        for attr in klass.swagger_types:
+            getattr(self, attr)
+
+    def __eq__(self, other):
+        materialize(self)
+        if isinstance(other, lazy_klass):
+            materialize(other)
+        return klass.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not __eq__(self, other)
+
+    namespace = {
+        attr: lazy_property(attr, attr_type)
+        for attr, attr_type in six.iteritems(klass.swagger_types)
+    }
+    # The raw data lives in a slot, so that once everything is materialized
+    # the __dict__ is the same as that of a normal model.
+    namespace.update({
+        '__slots__': ('_raw',),
+        '__doc__': klass.__doc__,
+        '__eq__': __eq__,
+        '__ne__': __ne__,
+        'materialize': materialize,
+    })
+    lazy_klass = type('Lazy' + klass.__name__, (klass,), namespace)
+    return lazy_klass
@@ -0,0 +1,90 @@
+# coding: utf-8
+
+"""
+    Strava API v3
+
+    Iteration over all pages of the list endpoints.
+
+    The list endpoints (e.g. RoutesApi.get_routes_by_athlete_id,
+    ActivitiesApi.get_logged_in_athlete_activities and
+    ClubsApi.get_club_members_by_id) return one page per request, and the last
+    page is the first one that has fewer items than requested. While the
+    caller processes a page, the next few pages are already requested:
+
+        routes_api = swagger_client.RoutesApi(api_client)
+        for route in iter_items(routes_api.get_routes_by_athlete_id,
+                                athlete_id, per_page=200):
+            print(route.name)
+"""
+
+from __future__ import absolute_import
+
+import collections
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def iter_pages(list_method, *args, **kwargs):
+    """Generates the pages of a list endpoint, as lists, until the first page
+    that is shorter than `per_page`.
+
+    :param list_method: A list method of one of the *Api classes, which is
+        called as list_method(*args, page=page, per_page=per_page, **kwargs).
+        With `_preload_content=False` the pages are the decoded JSON instead
+        of models.
+    :param int per_page: Number of items per page, 200 by default.
+    :param int prefetch: Number of pages to request ahead, 2 by default.
+    """
+    per_page = kwargs.pop('per_page', 200)
+    prefetch = kwargs.pop('prefetch', 2)
+    raw = kwargs.get('_preload_content') is False
+
+    # Set when the pages still being fetched are not needed anymore.
+    stopped = threading.Event()
+
+    def fetch(page):
+        if stopped.is_set():
+            return None
+        data = list_method(*args, page=page, per_page=per_page, **kwargs)
+        if raw:
+            response = data
+            if stopped.is_set():
+                # Not worth reading, drop the connection instead.
+                response.close()
+                return None
+            try:
+                data = json.loads(response.data)
+            finally:
+                response.release_conn()
+        return data
+
+    executor = ThreadPoolExecutor(max_workers=max(prefetch, 1))
+    # The futures of the pages that have been requested but not yielded, in
+    # order.
+    pending = collections.deque()
+    next_page = 1
+    try:
+        while True:
+            while len(pending) <= prefetch:
+                pending.append(executor.submit(fetch, next_page))
+                next_page += 1
+            items = pending.popleft().result()
+            yield items
+            if len(items) < per_page:
+                return
+    finally:
+        # The pages after the last one, or after the caller stopped, are not
+        # needed anymore. Those that are being requested already release
+        # their connection when the response comes in.
+        stopped.set()
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def iter_items(list_method, *args, **kwargs):
+    """Generates the items of all pages of a list endpoint, see iter_pages."""
+    for items in iter_pages(list_method, *args, **kwargs):
+        for item in items:
+            yield item
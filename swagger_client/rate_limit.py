@@ -0,0 +1,218 @@
+# coding: utf-8
+
+"""
+    Strava API v3
+
+    Pacing of requests to the Strava rate limits.
+
+    Strava limits the number of requests per application in a 15 minute window
+    and in a daily window. The windows reset at natural quarter hours and at
+    midnight UTC. Every response reports the limits and the current usage in
+    the `X-RateLimit-Limit` and `X-RateLimit-Usage` headers, as
+    comma-separated values for both windows.
+"""
+
+from __future__ import absolute_import
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Window(object):
+    """A token bucket for one rate limit window.
+
+    Tokens come in at the rate that spreads the remaining budget evenly over
+    the rest of the window, and up to the share of `burst_period` seconds
+    can be used at once. With a burst_period as long as the window, the
+    whole remaining budget can be used at once.
+    """
+
+    def __init__(self, name, period, limit, burst_period):
+        self.name = name
+        self.period = period
+        self.limit = limit
+        self.burst_period = burst_period
+        self.usage = 0
+        self.reset_at = self._next_reset(time.time())
+        self.tokens = self.burst(time.time())
+        self.refilled_at = time.time()
+
+    def burst(self, now):
+        return min(max(1.0, self.rate(now) * self.burst_period),
+                   self.remaining)
+
+    def _next_reset(self, now):
+        return (now // self.period + 1) * self.period
+
+    @property
+    def remaining(self):
+        return max(self.limit - self.usage, 0)
+
+    def rate(self, now):
+        """Sustainable requests per second for the rest of the window."""
+        return self.remaining / max(self.reset_at - now, 1.0)
+
+    def refill(self, now):
+        if now >= self.reset_at:
+            self.usage = 0
+            self.reset_at = self._next_reset(now)
+            self.tokens = self.burst(now)
+        self.tokens += (now - self.refilled_at) * self.rate(now)
+        self.tokens = min(self.tokens, self.burst(now))
+        self.refilled_at = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available."""
+        if self.tokens >= 1:
+            return 0.0
+        if not self.remaining:
+            return self.reset_at - now
+        return (1 - self.tokens) / self.rate(now)
+
+    def take(self):
+        self.tokens -= 1
+        self.usage += 1
+
+    def metrics(self):
+        return {
+            "limit": self.limit,
+            "usage": self.usage,
+            "remaining": self.remaining,
+            "reset_at": self.reset_at,
+        }
+
+
+class RateLimiter(object):
+    """Schedules requests within the 15 minute and daily rate limits.
+
+    Call `acquire` before a request, which blocks until the request fits in
+    both windows, and `update` with the response headers afterwards.
+
+    The 15 minute budget can be used up at once, since pacing within that
+    window would not increase the throughput. The daily budget is a hard
+    cap: once it is used up, requests wait for midnight.
+
+    With spread_daily, the daily budget is spread over the day instead, once
+    it is less than what the 15 minute windows until midnight allow. From
+    then on, every 15 minutes get an equal share of the remaining daily
+    budget. This keeps a long running job going all day, at the cost of
+    slowing down every request for most of the day.
+
+    :param short_limit: Requests per 15 minutes, until the API reports it.
+    :param long_limit: Requests per day, until the API reports it.
+    :param spread_daily: Whether to spread the daily budget over the day.
+    """
+
+    def __init__(self, short_limit=100, long_limit=1000, spread_daily=False):
+        short = Window("15min", 15 * 60, short_limit, 15 * 60)
+        day = 24 * 60 * 60
+        # Without spreading, the whole daily budget is one burst.
+        daily_burst_period = short.period if spread_daily else day
+        self.windows = [
+            short,
+            Window("daily", day, long_limit, daily_burst_period),
+        ]
+        self.spread_daily = spread_daily
+        self._lock = threading.Lock()
+
+    def __copy__(self):
+        # Configuration objects are copied, but the limits apply to the
+        # whole application so the limiter must stay shared.
+        return self
+
+    def acquire(self):
+        """Block until a request can be made, and count it."""
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            logger.debug("rate limited, waiting %.1fs", wait)
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """Count a request if it can be made right now.
+
+        :return: 0 if the request can be made, otherwise the number of
+            seconds to wait before trying again.
+        """
+        with self._lock:
+            now = time.time()
+            for window in self.windows:
+                window.refill(now)
+            short, daily = self.windows
+            wait = short.wait_time(now)
+            if not self.spread_daily or self._daily_limits(now):
+                wait = max(wait, daily.wait_time(now))
+            else:
+                # Not paced, but keep a full burst for when it is.
+                daily.tokens = daily.burst(now)
+            if wait <= 0:
+                for window in self.windows:
+                    window.take()
+            return wait
+
+    def _daily_limits(self, now):
+        """Whether the remaining daily budget is less than the 15 minute
+        windows until the daily reset allow."""
+        short, daily = self.windows
+        later_windows = max(daily.reset_at - short.reset_at, 0) // short.period
+        return daily.remaining < short.remaining + later_windows * short.limit
+
+    def update(self, headers):
+        """Update the limits and usage from the headers of a response.
+
+        :param headers: The response headers, as a dict-like object.
+        """
+        if not headers:
+            return
+        headers = {k.lower(): v for k, v in headers.items()}
+        limits = headers.get('x-ratelimit-limit')
+        usages = headers.get('x-ratelimit-usage')
+        if not limits or not usages:
+            return
+        try:
+            limits = [int(v) for v in limits.split(',')]
+            usages = [int(v) for v in usages.split(',')]
+        except ValueError:
+            logger.warning("unexpected rate limit headers: %s, %s",
+                           limits, usages)
+            return
+
+        with self._lock:
+            now = time.time()
+            for window, limit, usage in zip(self.windows, limits, usages):
+                window.refill(now)
+                # A raised limit gives tokens right away, a lowered one takes
+                # them.
+                window.tokens += limit - window.limit
+                window.limit = limit
+                # Requests that are still in flight are not in the reported
+                # usage yet, so never lower it within a window.
+                window.usage = max(window.usage, usage)
+                window.tokens = min(window.tokens, window.burst(now))
+
+    def exhausted(self):
+        """Mark the 15 minute window as used up, after a 429 response
+        without usable headers.
+        """
+        with self._lock:
+            window = self.windows[0]
+            window.refill(time.time())
+            window.usage = window.limit
+            window.tokens = 0
+
+    def metrics(self):
+        """The limit, usage, remaining budget and reset time (epoch seconds)
+        of both windows.
+        """
+        with self._lock:
+            now = time.time()
+            for window in self.windows:
+                window.refill(now)
+            return {window.name: window.metrics() for window in self.windows}
+
+
+default_rate_limiter = RateLimiter()
@@ -50,6 +50,28 @@ class RESTResponse(io.IOBase):
         return self.urllib3_response.getheader(name, default)
 
 
+def iter_content(resp, chunk_size=64 * 1024):
+    """Iterates over the body of a response that was requested with
+    `_preload_content=False`, in chunks of at most `chunk_size` bytes, without
+    reading it into memory first.
+
+    The connection goes back to the pool when the body is exhausted, and is
+    closed if the iteration is stopped early.
+
+    :param resp: urllib3.HTTPResponse object.
+    :param chunk_size: Maximum size of a chunk, in bytes.
+    """
+    completed = False
+    try:
+        for chunk in resp.stream(chunk_size, decode_content=True):
+            yield chunk
+        completed = True
+    finally:
+        if not completed:
+            resp.close()
+        resp.release_conn()
+
+
 class RESTClientObject(object):
 
     def __init__(self, configuration, pools_size=4, maxsize=None):
@@ -0,0 +1,320 @@
+"""
+Copying a route from Strava to Garmin.
+
+The copy consists of a few stages, some of which are independent of each other
+(getting the tcx from Strava and logging in to Garmin). The stages are run as a
+small dependency graph on a thread pool, so that independent stages overlap.
+"""
+
+import contextlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import garmin.course
+import garmin.course_file
+import garmin.elevation
+import garmin.elevation_cache
+import strava.tokens
+import swagger_client
+from copied_courses import copy_key
+
+log = logging.getLogger(__name__)
+
+
+class Dag(object):
+    """
+    A graph of stages, each of which is a function that gets the results of its
+    dependencies as arguments. Stages must be added after their dependencies.
+    Example of use: ::
+      dag = Dag()
+      dag.add("a", lambda: 1)
+      dag.add("b", lambda: 2)
+      dag.add("sum", lambda a, b: a + b, "a", "b")
+      results, timings = dag.run()
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.stages = []
+
+    def add(self, name, func, *dependencies):
+        known = set(stage[0] for stage in self.stages)
+        for dependency in dependencies:
+            if dependency not in known:
+                raise ValueError(
+                    "stage %r depends on unknown stage %r" % (name, dependency)
+                )
+        self.stages.append((name, func, dependencies))
+
+    def run(self, on_stage_done=None):
+        """
+        Run all stages and return two dicts: the results and the (start, end)
+        time of every stage, in seconds since the start of the run.
+        on_stage_done is called with the name of every stage that finishes.
+        """
+        start = time.perf_counter()
+        timings = {}
+
+        def run_stage(name, func, dependency_futures):
+            args = [f.result() for f in dependency_futures]
+            stage_start = time.perf_counter() - start
+            result = func(*args)
+            timings[name] = (stage_start, time.perf_counter() - start)
+            if on_stage_done is not None:
+                on_stage_done(name)
+            return result
+
+        # Stages are submitted in the order they were added, so the
+        # dependencies of a stage have always been started before it waits on
+        # them.
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for name, func, dependencies in self.stages:
+                futures[name] = executor.submit(
+                    run_stage, name, func, [futures[d] for d in dependencies]
+                )
+            results = {name: f.result() for name, f in futures.items()}
+        return results, timings
+
+
+def copy_route(
+    route_id,
+    route_type,
+    route_name,
+    garmin_pool,
+    strava_client=None,
+    garmin_import=False,
+    elevation_provider=None,
+    elevation_cache=None,
+    simplify_tolerance=None,
+    progress=None,
+    copied_courses=None,
+):
+    """
+    Copy a Strava route to a new Garmin course. Returns the id of the Garmin
+    course and the timings of the stages.
+
+    The tcx is parsed locally, which gives the same course as Garmin's course
+    import without the round trip. With garmin_import=True it is uploaded to
+    Garmin instead.
+
+    Elevations come from Garmin, or from the garmin.elevation.ElevationProvider
+    `elevation_provider` with Garmin as the fallback. With a
+    garmin.elevation_cache.ElevationCache, Garmin only gets the positions
+    that are not in the cache.
+
+    With a simplify_tolerance in meters, the course is simplified before the
+    elevations are looked up, see garmin.course.simplify_course. Only with an
+    elevation_provider that covers the whole course is the elevation gain kept
+    close to the original.
+
+    With a copied_courses.CopiedCourses, a route that was copied before with
+    the same positions, name, type and simplify_tolerance is not copied
+    again, and the id of the existing course is returned without any Garmin
+    calls.
+
+    progress is called with the name of every stage that is done.
+    """
+    if strava_client is None:
+        strava_client = swagger_client.ApiClient()
+    # Besides the route itself, what makes a copy different from another.
+    copy_settings = (route_name, route_type, simplify_tolerance)
+
+    def strava_login():
+        strava_client.configuration.access_token = strava.tokens.request_access_token()
+
+    def export_tcx(_):
+        # The body is read while it is parsed or uploaded to Garmin.
+        routes_api = swagger_client.RoutesApi(api_client=strava_client)
+        return routes_api.stream_route_as_tcx(route_id)
+
+    def read_tcx(tcx_chunks):
+        """The course, or the tcx for Garmin's import, and the copy key."""
+        if not garmin_import:
+            course = garmin.course_file.import_course(tcx_chunks)
+            if copied_courses is None:
+                return course, None
+            positions = ((p["latitude"], p["longitude"]) for p in course["geoPoints"])
+            return course, copy_key(positions, *copy_settings)
+        if copied_courses is None:
+            # No key needed, stream the tcx into the upload.
+            return tcx_chunks, None
+        # The key is needed before anything goes to Garmin.
+        tcx = b"".join(tcx_chunks)
+        positions = garmin.course_file.iter_positions(tcx)
+        return tcx, copy_key(positions, *copy_settings)
+
+    def find_copy(tcx):
+        if copied_courses is None:
+            return None
+        course_id = copied_courses.get(route_id, tcx[1])
+        if course_id is not None:
+            log.info("route %s was already copied to course %s", route_id, course_id)
+        return course_id
+
+    def garmin_login(copied_course_id=None):
+        if copied_course_id is not None:
+            return None
+        return stack.enter_context(garmin_pool.client())
+
+    def import_course(tcx, garmin_client):
+        if garmin_client is None:
+            return None
+        return garmin_client.import_course(tcx[0]).json()
+
+    def parse_course(tcx):
+        return tcx[0]
+
+    def simplify(course):
+        if course is None:
+            return None
+        # Local elevations are cheap enough to look up for all points, which
+        # lets the simplification keep the elevation gain too.
+        report = garmin.course.simplify_course(
+            course, simplify_tolerance, elevation_provider=elevation_provider
+        )
+        log.info(
+            "simplified %d to %d points (tolerance %.1fm), distance %.0fm to %.0fm",
+            report.points,
+            report.simplified_points,
+            report.tolerance,
+            report.distance,
+            report.simplified_distance,
+        )
+        if report.gain is None:
+            log.info("elevation gain not checked, not all elevations are local")
+        else:
+            log.info(
+                "elevation gain %.0fm %+.1fm, loss %.0fm %+.1fm",
+                report.gain,
+                report.gain_error,
+                report.loss,
+                report.loss_error,
+            )
+        return course
+
+    def post_elevation(course, garmin_client):
+        if garmin_client is None:
+            return None
+        provider = garmin.elevation.GarminElevationProvider(garmin_client)
+        if elevation_cache is not None:
+            provider = garmin.elevation_cache.CachedElevationProvider(
+                provider, elevation_cache
+            )
+        if elevation_provider is not None:
+            provider = garmin.elevation.FallbackElevationProvider(
+                elevation_provider, provider
+            )
+        return garmin.course.lookup_elevation(course["geoPoints"], provider)
+
+    def post_course(course, elevation_tuples, garmin_client, tcx, copied_course_id):
+        if copied_course_id is not None:
+            return {"courseId": copied_course_id}
+        garmin_activity_type = {1: 10, 2: 1}.get(route_type, 10)
+        garmin.course.add_course_info(
+            course, route_name, garmin_activity_type, elevation_tuples
+        )
+        response = garmin_client.post_course(course).json()
+        if copied_courses is not None:
+            copied_courses.put(route_id, tcx[1], response["courseId"])
+        return response
+
+    with contextlib.ExitStack() as stack:
+        dag = Dag()
+        dag.add("strava_login", strava_login)
+        dag.add("export_tcx", export_tcx, "strava_login")
+        dag.add("read_tcx", read_tcx, "export_tcx")
+        dag.add("find_copy", find_copy, "read_tcx")
+        if copied_courses is not None:
+            # Only log in to Garmin when the route has to be copied.
+            dag.add("garmin_login", garmin_login, "find_copy")
+        else:
+            dag.add("garmin_login", garmin_login)
+        if garmin_import:
+            dag.add("import_course", import_course, "read_tcx", "garmin_login")
+        else:
+            dag.add("import_course", parse_course, "read_tcx")
+        course_stage = "import_course"
+        if simplify_tolerance:
+            dag.add("simplify", simplify, "import_course")
+            course_stage = "simplify"
+        dag.add("post_elevation", post_elevation, course_stage, "garmin_login")
+        dag.add(
+            "post_course",
+            post_course,
+            course_stage,
+            "post_elevation",
+            "garmin_login",
+            "read_tcx",
+            "find_copy",
+        )
+        results, timings = dag.run(progress)
+
+    for name, (start, end) in sorted(timings.items(), key=lambda t: t[1]):
+        log.info("%s: %.0fms - %.0fms", name, start * 1000, end * 1000)
+    return results["post_course"]["courseId"], timings
+
+
+def copy_routes(
+    route_ids,
+    garmin_pool,
+    workers=4,
+    elevation_provider=None,
+    elevation_cache=None,
+    simplify_tolerance=None,
+    copied_courses=None,
+):
+    """
+    Copy many Strava routes to Garmin, `workers` at a time. The Garmin course
+    gets the name and type of the Strava route.
+
+    All copies share one Strava connection pool, and the Garmin sessions of
+    `garmin_pool`, whose size limits the number of concurrent Garmin calls.
+    Returns a list with a dict per route, with either a course_id or an error,
+    in the order of route_ids. See copy_route for elevation_provider,
+    elevation_cache, simplify_tolerance and copied_courses.
+    """
+    configuration = swagger_client.Configuration()
+    configuration.connection_pool_maxsize = workers
+    strava_client = swagger_client.ApiClient(configuration)
+    strava_client.configuration.access_token = strava.tokens.request_access_token()
+    routes_api = swagger_client.RoutesApi(api_client=strava_client)
+
+    def copy(route_id):
+        start = time.perf_counter()
+        result = {"route_id": route_id}
+        try:
+            route = routes_api.get_route_by_id(route_id)
+            result["course_id"], _ = copy_route(
+                route_id,
+                route.type,
+                route.name,
+                garmin_pool,
+                strava_client,
+                elevation_provider=elevation_provider,
+                elevation_cache=elevation_cache,
+                simplify_tolerance=simplify_tolerance,
+                copied_courses=copied_courses,
+            )
+        except Exception as e:
+            log.exception("copying route %s failed", route_id)
+            result["error"] = str(e)
+        result["seconds"] = time.perf_counter() - start
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(copy, route_ids))
+    elapsed = time.perf_counter() - start
+
+    succeeded = sum(1 for r in results if "course_id" in r)
+    log.info(
+        "copied %d of %d routes in %.1fs (%.2f routes/s)",
+        succeeded,
+        len(results),
+        elapsed,
+        len(results) / elapsed if elapsed else 0,
+    )
+    log.info("strava rate limits: %s", configuration.rate_limiter.metrics())
+    return results